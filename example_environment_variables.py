@@ -7,7 +7,7 @@ OPENAI_API_KEY = your_openai_api_key_here
 # OPENAI_MODEL=gpt-4o
 
 # Optional: Path to credentials file (if used instead of just .env)
-# CREDENTIALS_PATH=./get_credentials.py
+# CREDENTIALS_PATH=./lang_graph_examples/get_credentials.py
 
 # Add other API keys or credentials below if your examples use external services
 # WEATHER_API_KEY=your_weather_api_key_here
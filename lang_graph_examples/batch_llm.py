@@ -0,0 +1,136 @@
+"""
+This module contains helpers for evaluating many prompts with
+fewer HTTP requests.
+
+run_batch uses the OpenAI Batch API. The synchronous chat
+endpoint answers prompts one HTTP request at a time. For offline
+evaluation of a large list of prompts the Batch API is about half
+the cost and has much higher throughput: all the prompts are
+uploaded as one JSONL file, OpenAI processes them within a
+completion window (up to 24 hours), and the results are
+downloaded as one file. Use this path when you do not need the
+answers immediately.
+
+run_batch_in_one_request packs all the prompts into a single
+synchronous chat request. Use this path when the Batch API is
+too slow but you still want to cut N round trips to one.
+
+"""
+
+import json
+import io
+import re
+import time
+
+from get_credentials import get_openai_client
+
+# How long to wait between polls of the batch status, in seconds.
+POLL_INTERVAL = 10.0
+
+
+def run_batch(prompts, model="gpt-3.5-turbo", temperature=0.7,
+              poll_interval=POLL_INTERVAL):
+    '''
+    Submit all the prompts as one batch and wait for the results.
+
+    prompts is a list of strings. The function returns a list of
+    reply strings, where the i-th reply answers the i-th prompt.
+
+    Each prompt becomes one JSONL line with a custom_id. The
+    batch is uploaded, then polled until it completes, and the
+    output file is mapped back to the prompts by custom_id.
+
+    '''
+    client = get_openai_client()
+
+    # 1. Serialize each prompt as a JSONL request line.
+    # The custom_id records the index of the prompt so that
+    # replies can be matched to prompts.
+    lines = []
+    for i, prompt in enumerate(prompts):
+        lines.append(json.dumps({
+            "custom_id": f"prompt-{i}",
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": model,
+                "temperature": temperature,
+                "messages": [{"role": "user", "content": prompt}],
+            },
+        }))
+    jsonl = "\n".join(lines).encode("utf-8")
+
+    # 2. Upload the JSONL file and create the batch.
+    batch_file = client.files.create(
+        file=io.BytesIO(jsonl), purpose="batch")
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h",
+    )
+
+    # 3. Poll until the batch finishes.
+    while batch.status not in ("completed", "failed", "expired", "cancelled"):
+        time.sleep(poll_interval)
+        batch = client.batches.retrieve(batch.id)
+
+    if batch.status != "completed":
+        raise RuntimeError(
+            f"Batch {batch.id} did not complete. Status: {batch.status}")
+
+    # 4. Download the results and map replies back to prompts
+    # by custom_id.
+    output = client.files.content(batch.output_file_id).text
+    replies = [None] * len(prompts)
+    for line in output.splitlines():
+        result = json.loads(line)
+        index = int(result["custom_id"].split("-")[1])
+        replies[index] = (
+            result["response"]["body"]["choices"][0]["message"]["content"])
+    return replies
+
+
+# Matches the "1." / "2." prefixes that the model is asked to put
+# in front of each numbered answer.
+_ANSWER_PREFIX_RE = re.compile(r"^\s*\d+\.\s*", re.MULTILINE)
+
+
+def run_batch_in_one_request(prompts, model="gpt-3.5-turbo", temperature=0.7):
+    '''
+    Answer all the prompts with a single synchronous chat request.
+
+    prompts is a list of strings. The function returns a list of
+    reply strings, where the i-th reply answers the i-th prompt.
+
+    The chat endpoint does not accept a list of prompts, so the
+    prompts are batched at the text level: they are concatenated
+    into one numbered message, the model is asked to answer each
+    number separately, and the response is split back apart on
+    the numbered prefixes. One request replaces N requests, which
+    saves N-1 HTTP round trips.
+
+    '''
+    client = get_openai_client()
+
+    numbered = "\n".join(
+        f"{i + 1}. {prompt}" for i, prompt in enumerate(prompts))
+    message = (
+        "Answer each of the following numbered questions separately. "
+        "Prefix each answer with its number, like '1.'\n" + numbered)
+
+    response = client.chat.completions.create(
+        model=model,
+        temperature=temperature,
+        messages=[{"role": "user", "content": message}],
+    )
+    content = response.choices[0].message.content
+
+    # The first split element is whatever precedes answer 1;
+    # drop it and keep one element per numbered answer.
+    replies = [part.strip()
+               for part in _ANSWER_PREFIX_RE.split(content)[1:]]
+    if len(replies) != len(prompts):
+        raise ValueError(
+            f"Expected {len(prompts)} numbered answers "
+            f"but found {len(replies)}.")
+    return replies
@@ -3,41 +3,60 @@ This module is an example of a LangGraph with a branching
 node that routes the flow of execution through the graph
 based on the state.
 
+The node functions are asynchronous and the graph is invoked
+with asyncio so that the LLM calls for different inputs are
+made concurrently rather than one after the other.
+
+Routing uses the LangGraph Send API. The dispatcher returns a
+Send for each expert node that applies to the question. When
+both experts apply, both nodes run concurrently and their LLM
+calls overlap.
+
 """
 
+import asyncio
+import functools
+import operator
 import os
-from typing import TypedDict
-from openai import OpenAI
-from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
+import re
+from typing import TypedDict, List
+from typing_extensions import Annotated
+from langchain_core.prompts import ChatPromptTemplate
 from langgraph.graph import StateGraph
+from langgraph.types import Send
+
+from batch_llm import run_batch
+from get_credentials import get_chat_llm, retry_on_transient_errors
 
 # ---------------------------------------------
 # Step 1: Set up OpenAI.
 # ----------------------------------------------
 
-# Load API key from .env file
-load_dotenv()
-api_key = os.getenv('OPENAI_API_KEY')
+# get_chat_llm loads the API key from the .env file the first
+# time it is called and caches the client, so example modules
+# imported into the same process share one ChatOpenAI client.
+# The node functions call get_chat_llm instead of this module
+# holding a client, so importing the module and compiling the
+# graph does not construct an LLM client; the client is built
+# on the first node execution and cached after that.
 
-# Ensure the API key is available
-if not api_key:
-    raise ValueError("No API key found. Please check your .env file.")
 
-# Create an OpenAI client
-client = OpenAI(api_key=api_key)
-
-llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.7)
+def _llm():
+    return get_chat_llm(model="gpt-3.5-turbo", temperature=0.7)
 
 # ---------------------------------------------
 # Step 2: Define the shared state structure
 #
+# The Annotated operator.add on answers says that each expert
+# node appends its answer to the list rather than overwriting
+# it. This allows several expert nodes to answer the same
+# question concurrently.
 # ----------------------------------------------
 
 
 class State(TypedDict):
     question: str
-    answer: str
+    answers: Annotated[List[str], operator.add]
 
 # ---------------------------------------------
 # Step 3: Specify the functions that are executed
@@ -45,86 +64,158 @@ class State(TypedDict):
 # Each function returns a dict with keys that are
 # also keys of State.
 # Here we specify three functions:
-# tech_function, help_desk_function, and router_function.
+# tech_function, help_desk_function, and dispatch_function.
 #
 # ----------------------------------------------
 
+# The prompts the expert nodes send to the LLM, by node name.
+# Shared by the node functions and the offline batch path.
+EXPERT_PROMPTS = {
+    "tech_node":
+        "You are a tech support expert. Answer the question: {question}",
+    "help_desk_node":
+        "You are a help desk assistant. Answer the question: {question}",
+}
+
+# The templates are parsed once at module scope; each node call
+# only fills in the question instead of re-parsing an f-string.
+_TECH_PROMPT = ChatPromptTemplate.from_template(
+    EXPERT_PROMPTS["tech_node"])
+_HELP_DESK_PROMPT = ChatPromptTemplate.from_template(
+    EXPERT_PROMPTS["help_desk_node"])
+
+# Canned answers for questions that never need an LLM. A hit
+# here replaces an entire OpenAI round trip with a local
+# dictionary probe.
+FAQ = {
+    "office hours": "We're open 9am-5pm, Monday through Friday.",
+    "phone number": "You can reach the help desk at extension 4357.",
+}
+
+# One precompiled pattern matching any FAQ keyword,
+# case-insensitively, in the style of the routing patterns below.
+_FAQ_RE = re.compile(
+    "|".join(re.escape(keyword) for keyword in FAQ), re.IGNORECASE)
+
+
+def faq_answer(question):
+    '''
+    Return the canned answer if the question matches an FAQ
+    keyword, and None otherwise.
+
+    '''
+    match = _FAQ_RE.search(question)
+    if match:
+        return FAQ[match.group(0).lower()]
+    return None
+
 # tech function
 
 
-def tech_function(state: State) -> dict:
-    prompt = f"You are a tech support expert. Answer the question: {state['question']}"
-    response = llm.invoke(prompt)
-    # state["answer"] becomes response.content.
-    return {"answer": response.content}
+@retry_on_transient_errors
+async def tech_function(state: State) -> dict:
+    answer = faq_answer(state['question'])
+    if answer is not None:
+        return {"answers": [answer]}
+    messages = _TECH_PROMPT.format_messages(question=state['question'])
+    # await ainvoke so that other graph executions can
+    # proceed while this LLM call is waiting on the network.
+    response = await _llm().ainvoke(messages)
+    # The singleton list is appended to state["answers"].
+    return {"answers": [response.content]}
 
 # help_desk help desk function
 
 
-def help_desk_function(state: State) -> dict:
-    prompt = f"You are a help desk assistant. Answer the question: {state['question']}"
-    response = llm.invoke(prompt)
-    # state["answer"] becomes response.content.
-    return {"answer": response.content}
+@retry_on_transient_errors
+async def help_desk_function(state: State) -> dict:
+    answer = faq_answer(state['question'])
+    if answer is not None:
+        return {"answers": [answer]}
+    messages = _HELP_DESK_PROMPT.format_messages(question=state['question'])
+    response = await _llm().ainvoke(messages)
+    # The singleton list is appended to state["answers"].
+    return {"answers": [response.content]}
+
+# Dispatch function for branching
 
-# Router function for branching
+# Precompiled case-insensitive keyword patterns. re.search runs
+# in C and avoids building a lowercased copy of the question on
+# every call, which matters when routing many questions in bulk.
+_TECH_RE = re.compile(r'tech', re.IGNORECASE | re.ASCII)
+_HELP_RE = re.compile(r'help', re.IGNORECASE | re.ASCII)
 
 
-def router_function(state: State) -> dict:
+def dispatch_function(state: State) -> list:
     '''
-    This function is used in builder.add_conditional_edges()
-    which routes flow to tech_node if this function returns
-    {"next": "ask_IT"} and to help_desk_node if this function
-    returns {"next": "ask_help_desk"}.
+    This function is used in builder.add_conditional_edges().
+    It returns a list with a Send for each expert node that
+    applies to the question. A Send(node_name, state) tells
+    LangGraph to execute node_name with the given state. When
+    the list has more than one Send, the nodes run concurrently.
 
     '''
-    if 'tech' in state['question'].lower():
-        return {"next": "ask_IT"}
-    else:
-        return {"next": "ask_help_desk"}
+    question = state['question']
+    is_tech = _TECH_RE.search(question)
+    sends = []
+    if is_tech:
+        sends.append(Send("tech_node", state))
+    if not is_tech or _HELP_RE.search(question):
+        sends.append(Send("help_desk_node", state))
+    return sends
 
 
 # ---------------------------------------------
 # Step 4: Build the graph
+# The graph is built by build_graph so that variants of this
+# example can reuse the same code. build_graph is cached with
+# lru_cache: calling it again returns the compiled graph built
+# earlier instead of compiling a new graph.
 # ----------------------------------------------
 
-# 4.1 Create builder
-builder = StateGraph(State)
-
-# 4.2 Add nodes to the graph.
-# Give a name to the node and specify the function
-# that will be executed by the node.
-# Here we create three nodes:
-# router_node, tech_node, and help_desk_node.
-builder.add_node("router_node", router_function)
-builder.add_node("tech_node", tech_function)
-builder.add_node("help_desk_node", help_desk_function)
-
-# 4.3 Add edges to the graph.
-# In this example, all the edges are conditional edges.
-# The code for conditional branching
-builder.add_conditional_edges(
-    # router_node is the name of node from which branching occurs
-    "router_node",
-    # route_function returns dicts {'next': 'node_name'}
-    # So the lambda function argument is 'next'.
-    lambda x: x["next"],
-    # The lambda function returns either "ask_IT" or "ask_help_desk".
-    # The following dict specifies the next node to be executed
-    # depending on the value returned by the lambda function.
-    {
-        "ask_IT": "tech_node",
-        "ask_help_desk": "help_desk_node"
-    }
-)
-
-# 4.4 Set the entry and finish points for the graph
-builder.set_entry_point("router_node")
-builder.set_finish_point("tech_node")
-builder.set_finish_point("help_desk_node")
-
-# 4.5 Compile the graph
-graph = builder.compile()
+
+@functools.lru_cache(maxsize=None)
+def build_graph():
+    '''
+    Build and compile the branching graph. Flow goes from
+    router_node to the expert nodes chosen by dispatch_function.
+
+    '''
+    # 4.1 Create builder
+    builder = StateGraph(State)
+
+    # 4.2 Add nodes to the graph.
+    # Give a name to the node and specify the function
+    # that will be executed by the node.
+    # router_node is a no-op entry point; the routing itself is
+    # done by dispatch_function on the conditional edges.
+    builder.add_node("router_node", lambda x: x)
+    builder.add_node("tech_node", tech_function)
+    builder.add_node("help_desk_node", help_desk_function)
+
+    # 4.3 Add edges to the graph.
+    # dispatch_function returns a list of Send objects, one for
+    # each expert node that should run. The list of node names
+    # tells LangGraph which nodes dispatch_function may target.
+    builder.add_conditional_edges(
+        "router_node",
+        dispatch_function,
+        ["tech_node", "help_desk_node"]
+    )
+
+    # 4.4 Set the entry and finish points for the graph
+    builder.set_entry_point("router_node")
+    builder.set_finish_point("tech_node")
+    builder.set_finish_point("help_desk_node")
+
+    # 4.5 Compile the graph.
+    # checkpointer=None is the default but is stated explicitly:
+    # these short stateless runs need no persistence, and a
+    # checkpointer would add a write after every node execution.
+    return builder.compile(checkpointer=None)
+
+
+graph = build_graph()
 
 # ---------------------------------------------
 # Step 5: Run graph
@@ -134,7 +225,80 @@ graph_prompts = [
     {"question": "What are your office hours?"}
 ]
 
-for i, graph_prompt in enumerate(graph_prompts):
+
+# At most this many graph executions run at once, so that a
+# large prompt list does not oversubscribe the account's
+# OpenAI rate limit.
+MAX_CONCURRENT_PROMPTS = 10
+
+
+async def run_all_prompts(prompts):
+    '''
+    Invoke the graph on all the prompts concurrently.
+    asyncio.gather starts a graph execution for each prompt;
+    the LLM calls for different prompts overlap, so the total
+    time is roughly the time of the slowest prompt rather than
+    the sum of the times for all prompts. A semaphore bounds
+    how many executions are in flight at once.
+
+    '''
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_PROMPTS)
+
+    async def invoke_one(prompt):
+        async with semaphore:
+            return await graph.ainvoke(prompt)
+
+    return await asyncio.gather(
+        *[invoke_one(prompt) for prompt in prompts]
+    )
+
+
+# Number of prompts above which the offline Batch API path is
+# used instead of concurrent synchronous calls. Set the
+# environment variable BATCH_MODE=1 to force the batch path.
+BATCH_THRESHOLD = 16
+
+
+def run_all_prompts_offline(prompts):
+    '''
+    Answer all the prompts with the OpenAI Batch API instead of
+    invoking the graph. Each question is expanded into the same
+    expert prompts that dispatch_function would choose, all the
+    expert prompts are submitted as one batch, and the replies
+    are grouped back by question. Use this path for large
+    offline evaluations: it is about half the cost of the
+    synchronous endpoint but can take up to 24 hours.
+
+    '''
+    expert_prompts = []
+    # prompt_index[j] is the index of the question that
+    # expert_prompts[j] answers.
+    prompt_index = []
+    for i, prompt in enumerate(prompts):
+        state = {"question": prompt["question"], "answers": []}
+        for send in dispatch_function(state):
+            expert_prompts.append(
+                EXPERT_PROMPTS[send.node].format(
+                    question=prompt["question"]))
+            prompt_index.append(i)
+
+    replies = run_batch(expert_prompts)
+
+    results = [
+        {"question": prompt["question"], "answers": []}
+        for prompt in prompts
+    ]
+    for i, reply in zip(prompt_index, replies):
+        results[i]["answers"].append(reply)
+    return results
+
+
+if os.getenv("BATCH_MODE") == "1" or len(graph_prompts) > BATCH_THRESHOLD:
+    results = run_all_prompts_offline(graph_prompts)
+else:
+    results = asyncio.run(run_all_prompts(graph_prompts))
+
+for i, (graph_prompt, result) in enumerate(zip(graph_prompts, results)):
     print(f"\n❓ Input {i+1}: {graph_prompt['question']}")
-    result = graph.invoke(graph_prompt)
-    print("💬 Response:", result['answer'])
+    for answer in result['answers']:
+        print("💬 Response:", answer)
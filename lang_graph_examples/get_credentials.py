@@ -0,0 +1,208 @@
+"""get_credentials.py
+
+Utility for loading the OpenAI API key and returning an initialized OpenAI client.
+Supports:
+- .env file (via python-dotenv)
+- Environment variable fallback
+
+The clients are cached with functools.lru_cache so that the .env file is
+parsed once and a single OpenAI (or ChatOpenAI) client is shared by all
+example modules imported into the same process.
+
+"""
+
+import functools
+import os
+from dotenv import load_dotenv
+from openai import OpenAI
+
+# True after the .env file has been read into os.environ.
+# Guards against re-parsing the .env file on every call.
+_LOADED = False
+
+
+def load_api_key():
+    """Load the OpenAI API key from .env (first call only) or environment."""
+    global _LOADED
+    if not _LOADED:
+        load_dotenv()  # Load from .env file, if present
+        _LOADED = True
+    api_key = os.getenv("OPENAI_API_KEY")
+
+    if not api_key:
+        raise ValueError(
+            "❌ OPENAI_API_KEY not found. Please add it to a .env file or set it in your environment.\n"
+            "Example .env file:\n\n    OPENAI_API_KEY=your-api-key-here\n"
+        )
+    return api_key
+
+
+# Path of the SQLite file that stores cached LLM responses.
+LLM_CACHE_PATH = ".langchain.db"
+
+
+def retry_on_transient_errors(fn):
+    """Decorator that retries fn when OpenAI returns a transient error.
+
+    Rate limits (429) and dropped connections are routine when several
+    agents call OpenAI at once. Retrying up to three times with random
+    exponential backoff turns these transient failures into short
+    delays instead of losing the whole run. Works on both plain and
+    async functions.
+    """
+    import openai
+    from tenacity import (
+        retry,
+        retry_if_exception_type,
+        stop_after_attempt,
+        wait_random_exponential,
+    )
+
+    return retry(
+        stop=stop_after_attempt(3),
+        wait=wait_random_exponential(multiplier=1, max=20),
+        retry=retry_if_exception_type(
+            (openai.RateLimitError, openai.APIConnectionError)),
+    )(fn)
+
+
+# Maps the hash of a prompt to the asyncio task currently fetching
+# its completion. Entries exist only while a call is in flight.
+_INFLIGHT = {}
+
+
+async def dedup_ainvoke(llm, prompt):
+    """Invoke llm on a prompt string, coalescing concurrent duplicates.
+
+    When several concurrent tasks ask for the same prompt -- say two
+    identical documents dispatched to the same fan-out -- only the
+    first fires a request; the rest await the same in-flight task and
+    share its reply. The response cache handles repeats across runs;
+    this handles repeats that are simultaneously in flight, which the
+    cache cannot see because no response has been stored yet.
+    """
+    import asyncio
+    import hashlib
+
+    key = hashlib.sha256(prompt.encode()).digest()
+    task = _INFLIGHT.get(key)
+    if task is not None:
+        return await task
+    task = asyncio.ensure_future(llm.ainvoke(prompt))
+    _INFLIGHT[key] = task
+    try:
+        return await task
+    finally:
+        _INFLIGHT.pop(key, None)
+
+
+@functools.lru_cache(maxsize=1)
+def _enable_llm_cache():
+    """Turn on LangChain's response cache for all LLM calls.
+
+    The teaching examples invoke the LLM with the same prompts over and
+    over. The cache is keyed on (model, messages, parameters), so the
+    first run of a demo pays the normal OpenAI latency and cost and
+    later reruns are answered locally in microseconds. The SQLite
+    backend persists the cache across runs; if langchain_community is
+    not installed the cache falls back to in-memory, which still
+    removes repeated calls within one process.
+    """
+    from langchain_core.globals import set_llm_cache
+
+    try:
+        from langchain_community.cache import SQLiteCache
+        set_llm_cache(SQLiteCache(database_path=LLM_CACHE_PATH))
+    except ImportError:
+        from langchain_core.caches import InMemoryCache
+        set_llm_cache(InMemoryCache())
+
+
+def _http2_available():
+    """True when the optional h2 package is installed.
+
+    With HTTP/2 every concurrent LLM call multiplexes over one TCP+TLS
+    connection as a separate stream, so the fan-out examples open one
+    socket instead of one per in-flight call. httpx raises at client
+    construction if http2=True without h2, so the flag is probed here.
+    """
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+# Pool sizes for the shared HTTP clients. Wide enough for the
+# fan-out examples (batched candidate rewrites, binned document
+# summaries) to keep all their calls in flight at once.
+_POOL_LIMITS = dict(max_connections=64, max_keepalive_connections=32)
+
+
+@functools.lru_cache(maxsize=1)
+def _http_client():
+    """Return a shared httpx.Client with keep-alive connections.
+
+    Reusing one pooled client means only the first LLM call pays for
+    the TCP and TLS handshake; later calls ride the open connection.
+    """
+    import httpx
+
+    return httpx.Client(
+        http2=_http2_available(),
+        limits=httpx.Limits(**_POOL_LIMITS),
+        timeout=httpx.Timeout(60.0),
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _http_async_client():
+    """Return a shared httpx.AsyncClient for async LLM calls."""
+    import httpx
+
+    return httpx.AsyncClient(
+        http2=_http2_available(),
+        limits=httpx.Limits(**_POOL_LIMITS),
+        timeout=httpx.Timeout(60.0),
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def get_openai_client(verbose=False):
+    """Load OpenAI API key from .env or environment and return a client object.
+
+    The client is created once; later calls return the cached client.
+    """
+    api_key = load_api_key()
+
+    if verbose:
+        print("✅ OpenAI API key loaded successfully.")
+
+    return OpenAI(api_key=api_key)
+
+
+@functools.lru_cache(maxsize=None)
+def get_chat_llm(model="gpt-3.5-turbo", temperature=0.7):
+    """Return a ChatOpenAI client for the given model and temperature.
+
+    Clients are cached by (model, temperature) so that example modules
+    asking for the same model and temperature share a single client.
+
+    langchain_openai is imported here, not at module level, so that
+    importing this module (or an example that only builds a graph)
+    does not pay for the heavy import until an LLM is actually needed.
+    """
+    from langchain_openai import ChatOpenAI
+
+    load_api_key()
+    _enable_llm_cache()
+    # Inject the shared pooled HTTP clients so that every llm.invoke
+    # (and ainvoke) reuses open connections instead of reopening
+    # TCP+TLS per call -- this matters for looping examples that make
+    # several calls per run.
+    return ChatOpenAI(
+        model=model,
+        temperature=temperature,
+        http_client=_http_client(),
+        http_async_client=_http_async_client(),
+    )
@@ -1,34 +1,47 @@
 """
 This module is an example of a LangGraph that executes map-reduce.
-The graph is similar to that in parallel_basic.py. The difference is that
-this example uses three parallel nodes whereas parallel_basic.py uses two.
+The graph is similar to that in parallel_basic.py. The difference is
+that this example fans out with the Send API: the documents are
+split at the median length into a short bin and a long bin, and
+one summarize task runs per bin.
+
+The node functions are asynchronous, so the bins -- and the calls
+within each bin -- run concurrently: total wall time is roughly
+the time of the slowest call rather than the sum over the
+documents, and the short documents are not queued behind a long
+straggler.
 """
 
-import os
+import asyncio
+import statistics
 from typing import TypedDict, List
 from typing_extensions import Annotated
 import operator
-from openai import OpenAI
-from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph
+from langgraph.types import Send
+
+from get_credentials import dedup_ainvoke, get_chat_llm, load_api_key
 
 # ---------------------------------------------
 # Step 1: Set up OpenAI.
 # ----------------------------------------------
 
-# Load API key from .env file
-load_dotenv()
-api_key = os.getenv('OPENAI_API_KEY')
+# load_api_key reads the .env file once per process and caches
+# the result in get_credentials, so importing several example
+# modules does not repeat the directory walk and the parse. It
+# raises with instructions if the key is missing.
+api_key = load_api_key()
+
 
-# Ensure the API key is available
-if not api_key:
-    raise ValueError("No API key found. Please check your .env file.")
+# get_chat_llm loads credentials and constructs the shared
+# ChatOpenAI client the first time it is called and caches it.
+# The node functions call _llm() instead of this module holding
+# a client, so importing the module does not construct an LLM
+# client; the client is built on the first node execution.
 
-# Create an OpenAI client
-client = OpenAI(api_key=api_key)
 
-llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.7)
+def _llm():
+    return get_chat_llm(model="gpt-3.5-turbo", temperature=0.7)
 
 # ---------------------------------------------
 # Step 2: Define the shared state structure.
@@ -53,38 +66,98 @@ class State(TypedDict):
 
 # ----------------------------------------------
 
-# There are multiple map_nodes. Each node is an agent.
-# The j-th map_node agent calls summarize_nth_doc(j).
+# The map stage fans out dynamically: dispatch_docs groups the
+# documents into bins of similar length and sends one summarize
+# task per bin.
+
+
+def dispatch_docs(state):
+    '''
+    Returns a Send for each bin of documents. Documents are
+    split into two bins at the median document length, because
+    a long document's summary takes longest to generate: binning
+    keeps the short documents together so their bin finishes
+    early instead of every task waiting on one straggler. The
+    Sends run concurrently, and the fan-out adapts to however
+    many documents the input has.
+
+    '''
+    docs = state["docs"]
+    if len(docs) <= 2:
+        return [Send("summarize_bin_node", {"docs": list(docs)})]
+    median = statistics.median(len(doc) for doc in docs)
+    short_docs = [doc for doc in docs if len(doc) <= median]
+    long_docs = [doc for doc in docs if len(doc) > median]
+    return [
+        Send("summarize_bin_node", {"docs": bin_docs})
+        for bin_docs in (short_docs, long_docs) if bin_docs
+    ]
 
 
-def summarize_nth_doc(n: int):
+async def summarize_bin(bin_state):
     '''
-    Returns a function that summarizes the nth document in 
-    state["docs"].
-    This is an example of a function factory using closures.
+    Summarizes the documents in one bin. The calls are gathered
+    concurrently over the shared connection pool, so a bin costs
+    about one round-trip time. dedup_ainvoke coalesces identical
+    prompts: if the same document appears twice -- in this bin or
+    in the one running alongside it -- only one request is sent
+    and both tasks share the reply.
 
     '''
-    def fn(state):
-        doc = state["docs"][n]
-        content = llm.invoke(f"Summarize: {doc}").content
-        # Append the singleton list containing content to
-        # the list state["summaries"].
-        # The Annotated operator.add appends a list to a list.
-        # If x and y are lists then x + y is a list.
-        return {"summaries": [content]}
-    return fn
+    responses = await asyncio.gather(*(
+        dedup_ainvoke(_llm(), f"Summarize: {doc}")
+        for doc in bin_state["docs"]
+    ))
+    # The list of summaries is appended to state["summaries"]
+    # by the Annotated operator.add reducer.
+    return {"summaries": [response.content for response in responses]}
+
+
+# Combine at most this many summaries in one LLM prompt. Beyond
+# this, combine_summaries reduces hierarchically instead of
+# sending one huge prompt.
+COMBINE_FAN_IN = 4
 
 
 # Reduce node calls combine_summaries
-def combine_summaries(state):
+async def combine_summaries(state):
     '''
     Reads the list, state["summaries"], and combines the list
     of summaries into a single summary in state["final_summary"].
 
+    With COMBINE_FAN_IN or fewer summaries this is one LLM call
+    on the joined text. With more, the summaries are reduced
+    hierarchically: each level partitions the current summaries
+    into groups of COMBINE_FAN_IN, combines the groups with one
+    concurrent abatch call, and repeats on the partial results.
+    Each summary then appears in prompts O(log N) times instead
+    of once in a prompt that grows with N, and every level costs
+    about one round-trip time.
+
     '''
-    text = "\n".join(state['summaries'])
-    final = llm.invoke(f"Combine into a single summary: {text}").content
-    return {"final_summary": final}
+    summaries = state["summaries"]
+    while len(summaries) > COMBINE_FAN_IN:
+        groups = [
+            summaries[i:i + COMBINE_FAN_IN]
+            for i in range(0, len(summaries), COMBINE_FAN_IN)
+        ]
+        responses = await _llm().abatch([
+            "Combine into a single summary: " + "\n".join(group)
+            for group in groups
+        ])
+        summaries = [response.content for response in responses]
+    text = "\n".join(summaries)
+    # Stream the final combine call: tokens are printed as the
+    # model generates them, so the reader sees the first words
+    # after about one token's latency instead of waiting for the
+    # whole summary to finish.
+    print("\n✅ Final Summary:\n")
+    chunks = []
+    async for chunk in _llm().astream(f"Combine into a single summary: {text}"):
+        print(chunk.content, end="", flush=True)
+        chunks.append(chunk.content)
+    print()
+    return {"final_summary": "".join(chunks)}
 
 
 # ---------------------------------------------
@@ -94,40 +167,38 @@ def combine_summaries(state):
 # 4.1 Create builder
 builder = StateGraph(State)
 
-# # 4.2 Add nodes to the graph.
-# 4.1 Create builder
-builder = StateGraph(State)
-
 # 4.2 Specify nodes of the graph
 # Give a name to each node and specify the function
 # that will be executed by the node.
 
-# Add dummy entry node.
+# Add dummy entry node. dispatch_docs fans out from here.
 builder.add_node("entry_node", lambda x: x)
 
-# Add 3 map nodes: map_node_0, map_node_1, map_node_2
-# summarize_nth_doc(n) is the function fn(state) that
-# returns a dict {"summaries": [content]}
-for n in range(3):
-    builder.add_node(f"map_node_{n}", summarize_nth_doc(n))
+# Add summarize node. dispatch_docs runs one instance of this
+# node per bin of documents.
+builder.add_node("summarize_bin_node", summarize_bin)
 
 # Add reduce node
 builder.add_node("reduce_node", combine_summaries)
 
 # 4.3 Specify the edges between nodes of the graph.
-for n in range(3):
-    # Fan out: Connect entry_node to map nodes.
-    builder.add_edge("entry_node", f"map_node_{n}")
-
-    # Fan in: Connect map nodes to reduce node.
-    builder.add_edge(f"map_node_{n}", "reduce_node")
+# Fan out: dispatch_docs returns one Send per bin. The list of
+# node names tells LangGraph which nodes dispatch_docs may
+# target.
+builder.add_conditional_edges(
+    "entry_node", dispatch_docs, ["summarize_bin_node"])
+# Fan in: every summarize task feeds the reduce node.
+builder.add_edge("summarize_bin_node", "reduce_node")
 
 # 4.4 Set the entry and finish nodes of the graph
 builder.set_entry_point("entry_node")
 builder.set_finish_point("reduce_node")
 
 # 4.5 Compile the graph
-graph = builder.compile()
+# checkpointer=None is the default but is stated explicitly:
+# these one-shot demo runs keep no history, and a checkpointer
+# would serialize the state after every superstep.
+graph = builder.compile(checkpointer=None)
 
 # ---------------------------------------------
 # Step 5: Run graph
@@ -142,8 +213,8 @@ graph_prompt = {
         "Map-Reduce is a distributed processing technique for large-scale data analysis."
     ]
 }
-# Execute the graph.
-result = graph.invoke(graph_prompt)
-# result is the final value of state.
-print("\n✅ Final Summary:\n")
-print(result['final_summary'])
+# Execute the graph. asyncio.run drives the async node
+# functions on one event loop. The final summary is streamed to
+# the terminal by combine_summaries as it is generated; result
+# still holds the complete final value of state.
+result = asyncio.run(graph.ainvoke(graph_prompt))
@@ -9,42 +9,47 @@ python3 multi_agent_coordination_basic.py "Make coffee."
 
 The user input is an instruction to achieve a goal such as brew a cup of coffee.
 The planner_node determines a plan as specified in the instruction.
-The executor_node executes the plan, which in this case is simulated by returning a string 
+The executor_node executes the plan, which in this case is simulated by returning a string
 indicating that execution has completed.
-The validator_node checks if the execution was correct.
+The validator_node checks the execution speculatively: it runs
+concurrently with the executor, validating the result it predicts
+from the plan. The commit_node keeps the speculative verdict when
+the prediction matches the actual result and re-validates otherwise.
 
-This pattern is used to coordinate multiple agents. 
-The graph structure is the same as in sequential_basic.py
+This pattern is used to coordinate multiple agents.
 
 
 
 """
 
-import os
+import functools
 import sys
 from typing import TypedDict, Literal
-from openai import OpenAI
-from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph, END
 
+from get_credentials import get_chat_llm, load_api_key
+
 
 # ---------------------------------------------
 # Step 1: Set up OpenAI.
 # ----------------------------------------------
 
-# Load API key from .env file
-load_dotenv()
-api_key = os.getenv('OPENAI_API_KEY')
+# load_api_key reads the .env file once per process and caches
+# the result in get_credentials, so importing several example
+# modules does not repeat the directory walk and the parse. It
+# raises with instructions if the key is missing.
+api_key = load_api_key()
+
 
-# Ensure the API key is available
-if not api_key:
-    raise ValueError("No API key found. Please check your .env file.")
+# get_chat_llm loads credentials and constructs the shared
+# ChatOpenAI client the first time it is called and caches it.
+# The node functions call _llm() instead of this module holding
+# a client, so importing the module does not construct an LLM
+# client; the client is built on the first node execution.
 
-# Create an OpenAI client
-client = OpenAI(api_key=api_key)
 
-llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.7)
+def _llm():
+    return get_chat_llm(model="gpt-3.5-turbo", temperature=0.7)
 
 # ---------------------------------------------
 # Step 2: Define the shared state structure
@@ -55,6 +60,9 @@ class State(TypedDict):
     goal: str
     plan: str
     result: str
+    # The result the validator predicted while speculating; the
+    # commit node compares it with the actual result.
+    predicted_result: str
     is_valid: bool
 
 
@@ -67,7 +75,7 @@ class State(TypedDict):
 
 def planner_function(state: State) -> dict:
     prompt = f"Develop a short plan to achieve this goal: {state['goal']}"
-    response = llm.invoke(prompt)
+    response = _llm().invoke(prompt)
     plan_determined_by_LLM = response.content
     print("Planner generated the following plan: \n")
     print(plan_determined_by_LLM)
@@ -87,43 +95,106 @@ def executor_function(state: State) -> dict:
     return {"result": execution}
 
 
+# Schema for the validator's reply. Constraining the LLM to
+# return this structure makes the verdict a boolean: there is
+# no free-form text to lowercase and substring-match, so a reply
+# like "yesterday's run failed" cannot be misread as "yes", and
+# the reply is a few tokens instead of a sentence.
+class ValidationResult(TypedDict):
+    valid: bool
+
+
+@functools.lru_cache(maxsize=1)
+def _validator_llm():
+    return _llm().with_structured_output(ValidationResult)
+
+
 def validator_function(state: State) -> dict:
     '''
-    Reads state['result'] and assigns value to state['is_valid'].
+    Speculatively validates while the executor runs. The
+    validator predicts the executor's result from state['plan']
+    and validates the prediction, assigning state['is_valid']
+    and state['predicted_result']. Because this node runs in the
+    same superstep as executor_node, the validator's LLM round
+    trip overlaps the execution instead of following it.
+
+    '''
+    predicted_result = f"Executing: {state['plan']}"
+    prompt = f"Does this execution look correct? {predicted_result}"
+    result = _validator_llm().invoke(prompt)
+    valid = bool(result["valid"])
+    print("Validator checked the predicted result:",
+          "Valid" if valid else "Invalid")
+    return {"is_valid": valid, "predicted_result": predicted_result}
+
+
+def commit_function(state: State) -> dict:
+    '''
+    Reads state['result'] and state['predicted_result']. If the
+    executor produced what the validator predicted, the
+    speculative verdict stands and no further work is done.
+    Otherwise the speculation is discarded and the validator is
+    re-run on the actual result.
 
     '''
-    prompt = f"Does this execution look correct? {state['result']}. Respond yes or no."
-    response = llm.invoke(prompt)
-    valid = "yes" in response.content.lower()
+    if state["result"] == state["predicted_result"]:
+        print("Commit: speculative validation matches the actual result.")
+        return {}
+    print("Commit: prediction missed; re-validating the actual result.")
+    prompt = f"Does this execution look correct? {state['result']}"
+    result = _validator_llm().invoke(prompt)
+    valid = bool(result["valid"])
     print("Validator checked the result:", "Valid" if valid else "Invalid")
     return {"is_valid": valid}
 
 
 # ---------------------------------------------
 # Step 4: Build the graph
+# The graph is built by build_graph, memoized with lru_cache so
+# that repeated construction shares one compiled graph. The
+# graph is compiled inside the __main__ guard below, so merely
+# importing this module pays nothing for node validation and
+# channel wiring.
 # ----------------------------------------------
 
-# 4.1 Create builder
-builder = StateGraph(State)
-
-# 4.2 Specify nodes of the graph
-# Give a name to each node and specify the function
-# that will be executed by the node.
 
-builder.add_node("planner_node", planner_function)
-builder.add_node("executor_node", executor_function)
-builder.add_node("validator_node", validator_function)
-
-# 4.3 Specify the edges between nodes of the graph.
-builder.add_edge("planner_node", "executor_node")
-builder.add_edge("executor_node", "validator_node")
-builder.add_edge("validator_node", END)
-
-# 4.4 Set the entry and finish nodes of the graph
-builder.set_entry_point("planner_node")
+@functools.lru_cache(maxsize=1)
+def build_graph():
+    '''
+    Build and compile the planner/executor/validator graph.
 
-# 4.5 Compile the graph
-graph = builder.compile()
+    '''
+    # 4.1 Create builder
+    builder = StateGraph(State)
+
+    # 4.2 Specify nodes of the graph
+    # Give a name to each node and specify the function
+    # that will be executed by the node.
+
+    builder.add_node("planner_node", planner_function)
+    builder.add_node("executor_node", executor_function)
+    builder.add_node("validator_node", validator_function)
+    builder.add_node("commit_node", commit_function)
+
+    # 4.3 Specify the edges between nodes of the graph.
+    # The executor and the speculative validator both follow the
+    # planner, so they run in the same superstep: wall time is
+    # max(execute, validate) instead of their sum. The commit
+    # node joins the two branches.
+    builder.add_edge("planner_node", "executor_node")
+    builder.add_edge("planner_node", "validator_node")
+    builder.add_edge("executor_node", "commit_node")
+    builder.add_edge("validator_node", "commit_node")
+    builder.add_edge("commit_node", END)
+
+    # 4.4 Set the entry and finish nodes of the graph
+    builder.set_entry_point("planner_node")
+
+    # 4.5 Compile the graph
+    # checkpointer=None is the default but is stated explicitly:
+    # these one-shot demo runs keep no history, and a checkpointer
+    # would serialize the state after every superstep.
+    return builder.compile(checkpointer=None)
 
 # ---------------------------------------------
 # Step 5: Run graph
@@ -147,5 +218,6 @@ if __name__ == "__main__":
 
     # graph_prompt, is a dict that specifies some fields of state.
     graph_prompt = {"goal": goal}
-    # Execute the graph.
+    # Build (or fetch the cached) graph and execute it.
+    graph = build_graph()
     result = graph.invoke(graph_prompt)
@@ -2,32 +2,40 @@
 This module is an example of a LangGraph with two nodes in parallel and
 where both needs feed into a single merge node.
 
+The node functions are asynchronous, so the two parallel nodes
+make their LLM calls concurrently on one event loop: the longer
+of the two calls determines the wall time, not their sum.
+
 """
 
+import asyncio
 import pprint
-import os
 from typing import TypedDict
-from openai import OpenAI
-from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
+from langchain_core.prompts import ChatPromptTemplate
 from langgraph.graph import StateGraph
 
+from get_credentials import get_chat_llm, load_api_key
+
 # ---------------------------------------------
 # Step 1: Set up OpenAI.
 # ----------------------------------------------
 
-# Load API key from .env file
-load_dotenv()
-api_key = os.getenv('OPENAI_API_KEY')
+# load_api_key reads the .env file once per process and caches
+# the result in get_credentials, so importing several example
+# modules does not repeat the directory walk and the parse. It
+# raises with instructions if the key is missing.
+api_key = load_api_key()
 
-# Ensure the API key is available
-if not api_key:
-    raise ValueError("No API key found. Please check your .env file.")
 
-# Create an OpenAI client
-client = OpenAI(api_key=api_key)
+# get_chat_llm loads credentials and constructs the shared
+# ChatOpenAI client the first time it is called and caches it.
+# The node functions call _llm() instead of this module holding
+# a client, so importing the module does not construct an LLM
+# client; the client is built on the first node execution.
 
-llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.7)
+
+def _llm():
+    return get_chat_llm(model="gpt-3.5-turbo", temperature=0.7)
 
 # ---------------------------------------------
 # Step 2: Define the shared state structure
@@ -49,39 +57,61 @@ class State(TypedDict):
 # also keys of State.
 # ----------------------------------------------
 
+# The prompt templates are parsed once at module scope; each
+# invocation only fills in the state values instead of building
+# a fresh prompt string.
+_GREET_PROMPT = ChatPromptTemplate.from_template(
+    "Say a short sentence about {name}.")
+_TOPIC_PROMPT = ChatPromptTemplate.from_template(
+    "Tell me a short fact about {topic}.")
+_MERGE_PROMPT = ChatPromptTemplate.from_template(
+    "Make a joke about {greeting} and {fact}")
+
 
-def greet_function(state: State) -> dict:
+async def greet_function(state: State) -> dict:
     '''
     Reads state['name'] and assigns value to state['greeting'].
 
     '''
-    prompt = f"Say a short sentence about {state['name']}."
-    response = llm.invoke(prompt)
+    messages = _GREET_PROMPT.format_messages(name=state['name'])
+    # await _llm().ainvoke so the call from topic_function can
+    # proceed while this call waits on the network.
+    response = await _llm().ainvoke(messages)
     # state["greeting"] becomes response.content.
     return {"greeting": response.content}
 
 
-def topic_function(state: State) -> dict:
+async def topic_function(state: State) -> dict:
     '''
     Reads state['topic'] and assigns value to state['fact'].
 
     '''
-    prompt = f"Tell me a short fact about {state['topic']}."
-    response = llm.invoke(prompt)
+    messages = _TOPIC_PROMPT.format_messages(topic=state['topic'])
+    response = await _llm().ainvoke(messages)
     # state["fact"] becomes response.content.
     return {"fact": response.content}
 
 
-def merge_function(state: State) -> dict:
+async def merge_function(state: State) -> dict:
     '''
-    Reads state['greeting'] and state['fact'] and 
+    Reads state['greeting'] and state['fact'] and
     assigns value to state['summary'].
 
     '''
-    prompt = f"Make a joke about {state['greeting']} and {state['fact']}"
-    response = llm.invoke(prompt)
-    # state["summary"] becomes response.content.
-    return {"summary": response.content}
+    messages = _MERGE_PROMPT.format_messages(
+        greeting=state['greeting'], fact=state['fact'])
+    # Stream the merge call: tokens are printed as the model
+    # generates them, so the reader sees the first words after
+    # about one token's latency instead of waiting for the whole
+    # reply.
+    print("🎉 Summary (streamed):\n")
+    chunks = []
+    async for chunk in _llm().astream(messages):
+        print(chunk.content, end="", flush=True)
+        chunks.append(chunk.content)
+    print()
+    # state["summary"] becomes the accumulated streamed text.
+    return {"summary": "".join(chunks)}
 
 
 # ---------------------------------------------
@@ -113,7 +143,10 @@ builder.set_entry_point("entry_node")
 builder.set_finish_point("merge_node")
 
 # 4.5 Compile the graph
-graph = builder.compile()
+# checkpointer=None is the default but is stated explicitly:
+# these one-shot demo runs keep no history, and a checkpointer
+# would serialize the state after every superstep.
+graph = builder.compile(checkpointer=None)
 
 # ---------------------------------------------
 # Step 5: Run graph
@@ -124,9 +157,12 @@ graph_prompt = {
     "name": "Prof. K. Mani Chandy",
     "topic": "distributed systems"
 }
-# Execute the graph.
-result = graph.invoke(graph_prompt)
-# result is the final value of state.
-print(f"Printing the state after graph execution completes. \n")
+# Execute the graph. asyncio.run drives the async node
+# functions; LangGraph schedules the two edges out of
+# entry_node concurrently.
+# The summary is streamed to the terminal by merge_function as
+# it is generated; result still holds the complete final state.
+result = asyncio.run(graph.ainvoke(graph_prompt))
+print(f"\nPrinting the state after graph execution completes. \n")
 print("🎉 Result:\n")
 pprint.pprint(result)
@@ -1,9 +1,7 @@
-import os
 import ast
-from openai import OpenAI
-from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph, END
+
+from get_credentials import get_chat_llm, load_api_key
 from typing import TypedDict, Optional
 
 
@@ -11,17 +9,21 @@ from typing import TypedDict, Optional
 # Step 1: Set up OpenAI.
 # ----------------------------------------------
 
-# Load API key from .env file
-load_dotenv()
-api_key = os.getenv('OPENAI_API_KEY')
+# load_api_key reads the .env file once per process and caches
+# the result in get_credentials, so importing several example
+# modules does not repeat the directory walk and the parse. It
+# raises with instructions if the key is missing.
+api_key = load_api_key()
+
+# get_chat_llm loads credentials and constructs the shared
+# ChatOpenAI client the first time it is called and caches it.
+# The node functions call _llm() instead of this module holding
+# a client, so importing the module does not construct an LLM
+# client; the client is built on the first node execution.
 
-# Ensure the API key is available
-if not api_key:
-    raise ValueError("No API key found. Please check your .env file.")
 
-# Create an OpenAI client
-client = OpenAI(api_key=api_key)
-llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.3)
+def _llm():
+    return get_chat_llm(model="gpt-3.5-turbo", temperature=0.3)
 
 
 # ---------------------------------------------
@@ -75,7 +77,7 @@ def generate_essay_function(state: State) -> dict:
     distinctive voice.
 
     '''
-    result = llm.invoke(prompt)
+    result = _llm().invoke(prompt)
     essay_output = result.content
     return {"essay_output": essay_output}
 
@@ -107,7 +109,7 @@ def generate_genre_output_function(state: State) -> dict:
     Write a {genre} in the style of {author}.
     The {genre} should be short and in the author's unique voice.
     '''
-    result = llm.invoke(prompt)
+    result = _llm().invoke(prompt)
     genre_output = result.content
     return {"genre_output": genre_output}
 
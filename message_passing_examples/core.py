@@ -107,9 +107,35 @@ loop terminates when a '__STOP__' message is received.
 """
 
 from __future__ import annotations
-from multiprocessing import SimpleQueue
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import SimpleQueue, shared_memory
+from multiprocessing.queues import SimpleQueue as _PipeQueue
+from threading import Event, local as threading_local
 from typing import Optional, List, Callable, Dict, Tuple, Any
-import inspect
+import sys
+
+# The stop sentinel. Interning lets the hot loops compare identity
+# (one pointer compare) before falling back to string equality, and
+# callers may 'from core import STOP' and send it directly. Sending
+# the literal string '__STOP__' keeps working: the equality fallback
+# catches strings built at runtime that are not the interned object.
+STOP = sys.intern("__STOP__")
+
+
+# Pipe-backed queues returned by Block.close, reused by later
+# networks. Each SimpleQueue costs a pipe2 syscall and two file
+# descriptors; rebuilding networks repeatedly (notebooks, test
+# loops) would otherwise allocate and leak those per rebuild. The
+# deque-backed queues cost nothing to build and are not pooled.
+_QUEUE_POOL: List[SimpleQueue] = []
+
+
+def _alloc_simple_queue():
+    # Reuse a pooled pipe-backed queue, or make one.
+    if _QUEUE_POOL:
+        return _QUEUE_POOL.pop()
+    return SimpleQueue()
 
 
 def is_queue(q):
@@ -117,21 +143,261 @@ def is_queue(q):
     return callable(getattr(q, "put", None)) and callable(getattr(q, "get", None))
 
 
+class _PortMap(dict):
+    """
+    Maps port name -> queue, and mirrors every entry into a flat list
+    indexed by the port's position in the port list. Name-based code
+    uses this as a plain dict; the fast paths (Agent.send_i and
+    Agent.recv_i) index self.queues, replacing a hashed string lookup
+    per operation with a list index.
+
+    Each entry's put and get are bound once, at assignment, into
+    put_map/get_map (by name) and puts/gets (by index). The send and
+    recv hot paths call these directly, so a message costs one lookup
+    that lands on the bound method -- no second lookup for the queue
+    and no bound-method creation per call. Assigning a queue through
+    __setitem__ keeps all the tables in step.
+
+    """
+
+    def __init__(self, ports: List[str], factory: Optional[Callable] = None):
+        super().__init__()
+        self.index: Dict[str, int] = {
+            port: i for i, port in enumerate(ports)}
+        self.queues: List[Any] = [None] * len(ports)
+        self.puts: List[Optional[Callable]] = [None] * len(ports)
+        self.gets: List[Optional[Callable]] = [None] * len(ports)
+        self.put_map: Dict[str, Optional[Callable]] = {}
+        self.get_map: Dict[str, Optional[Callable]] = {}
+        for port in ports:
+            self[port] = factory() if factory is not None else None
+
+    def __setitem__(self, port, queue):
+        super().__setitem__(port, queue)
+        i = self.index.get(port)
+        if i is None:
+            i = len(self.queues)
+            self.index[port] = i
+            self.queues.append(None)
+            self.puts.append(None)
+            self.gets.append(None)
+        self.queues[i] = queue
+        put = getattr(queue, "put", None)
+        get = getattr(queue, "get", None)
+        self.puts[i] = put
+        self.gets[i] = get
+        self.put_map[port] = put
+        self.get_map[port] = get
+
+
+class InprocQueue:
+    """
+    The default queue, for blocks that run as threads of one process.
+
+    Every block shares the process, so SimpleQueue's pipe and fork-safe
+    lock buy nothing: a message put on a queue is a plain Python
+    reference that the consuming block pops off. put and get are a
+    deque append and popleft with no lock and no syscall -- both are
+    atomic, and any number of producer threads may put. A consumer that
+    finds the queue empty sleeps on an Event until a producer signals,
+    instead of spinning on a core while idle.
+
+    """
+
+    def __init__(self):
+        self._items = deque()
+        self._not_empty = Event()
+
+    def put(self, msg):
+        self._items.append(msg)
+        self._not_empty.set()
+
+    def get(self):
+        while True:
+            try:
+                return self._items.popleft()
+            except IndexError:
+                # Queue is empty. Clear the event and re-check so a
+                # message that arrives during the clear is not missed,
+                # then sleep until a producer signals.
+                self._not_empty.clear()
+                if self._items:
+                    continue
+                self._not_empty.wait(timeout=0.1)
+
+    def empty(self):
+        return not self._items
+
+
+class SpscQueue:
+    """
+    A queue for an inport with a single producer and a single consumer.
+
+    SimpleQueue moves every message through a pipe and takes a lock on
+    every operation. By connection rule 4 an outport is connected exactly
+    once, so an inport fed by one edge has one producer: messages can be
+    passed as plain object references. deque.append and deque.popleft are
+    atomic, so put and get need no lock and no pipe; a consumer that finds
+    the queue empty sleeps on an Event until the producer signals.
+
+    """
+
+    def __init__(self):
+        self._items = deque()
+        self._not_empty = Event()
+
+    def put(self, msg):
+        self._items.append(msg)
+        self._not_empty.set()
+
+    def get(self):
+        while True:
+            try:
+                return self._items.popleft()
+            except IndexError:
+                # Queue is empty. Clear the event and re-check so a
+                # message that arrives during the clear is not missed,
+                # then sleep until the producer signals.
+                self._not_empty.clear()
+                if self._items:
+                    continue
+                self._not_empty.wait(timeout=0.1)
+
+    def empty(self):
+        return not self._items
+
+
+class ZmqQueue:
+    """
+    A queue carried by ZeroMQ PUSH/PULL sockets over an ipc://
+    endpoint, for networks whose blocks run as separate processes on
+    one host. ZeroMQ batches writes internally, so throughput on
+    large inter-process streams is well above SimpleQueue's
+    one-pipe-write-per-message. Several producers may put to the same
+    queue: pyzmq sockets are not thread-safe, so each producing
+    thread -- in each process -- lazily opens its own PUSH socket to
+    the endpoint, and the consumer's PULL socket merges the streams.
+
+    Requires the optional pyzmq package; selecting the "zmq-ipc"
+    transport without it raises ImportError.
+
+    """
+
+    def __init__(self):
+        # Fail at selection time, not at first put, if pyzmq is absent.
+        try:
+            import zmq  # noqa: F401 -- availability check
+        except ImportError:
+            raise ImportError(
+                "The 'zmq-ipc' transport needs the pyzmq package. "
+                "Install it with: pip install pyzmq"
+            )
+        import tempfile
+        import uuid
+        self._endpoint = "ipc://{}/core-zmq-{}".format(
+            tempfile.gettempdir(), uuid.uuid4().hex)
+        # Sockets are created lazily -- a PUSH socket per producing
+        # thread, because pyzmq sockets must not be shared between
+        # threads, and per process, because ZeroMQ sockets cannot
+        # cross a fork. The single consumer owns the one PULL socket.
+        self._push_local = threading_local()
+        self._pull = None
+
+    def put(self, msg):
+        push = getattr(self._push_local, "socket", None)
+        if push is None:
+            import zmq
+            push = zmq.Context.instance().socket(zmq.PUSH)
+            push.connect(self._endpoint)
+            self._push_local.socket = push
+        push.send_pyobj(msg)
+
+    def get(self):
+        if self._pull is None:
+            import zmq
+            self._pull = zmq.Context.instance().socket(zmq.PULL)
+            self._pull.bind(self._endpoint)
+        return self._pull.recv_pyobj()
+
+    def __getstate__(self):
+        # Only the endpoint crosses to another process; each process
+        # opens its own sockets.
+        return self._endpoint
+
+    def __setstate__(self, endpoint):
+        self._endpoint = endpoint
+        self._push_local = threading_local()
+        self._pull = None
+
+
+# How many messages Agent.send_batch accumulates before it puts them
+# on the queue as one unit.
+BATCH_SIZE = 64
+
+
+class _MessageBatch(list):
+    # Marker for a list of messages that send_batch put on a queue as
+    # one unit. recv unpacks instances transparently, so a plain list
+    # sent with send is still delivered as a single message.
+    pass
+
+
+class _ShmDescriptor:
+    # Names a payload that send_shm parked in a shared memory block.
+    # Only this small descriptor crosses the queue; the payload bytes
+    # stay in place until recv_shm reads them.
+    __slots__ = ("name", "length")
+
+    def __init__(self, name: str, length: int):
+        self.name = name
+        self.length = length
+
+
+# The transports a Network can use between its blocks. Network.run
+# executes every block on a worker thread of one process under all of
+# them; the transports differ in the queues that carry the messages
+# (and "process"/"zmq-ipc" queues also work across OS processes for
+# blocks driven outside Network.run).
+# "inproc":  deques passing object references -- the default.
+# "thread":  SPSC deques for single-producer inports, SimpleQueue for
+#            merge inports.
+# "process": blocks run as separate OS processes -- SimpleQueue pipes.
+# "zmq-ipc": blocks run as separate processes -- ZeroMQ PUSH/PULL over
+#            ipc:// sockets (needs the optional pyzmq package).
+TRANSPORTS = ("inproc", "thread", "process", "zmq-ipc")
+
+
 class Block:
+    # The attribute set of a block is fixed, so instances store their
+    # attributes in a compact slot array instead of a per-instance
+    # __dict__: attribute reads on the send/recv hot paths become
+    # offset loads, and each block is smaller. Subclasses declare only
+    # the slots they add.
+    __slots__ = ("name", "description", "_is_network",
+                 "inports", "outports", "_inports_set", "_outports_set",
+                 "in_q", "out_q")
+
     def __init__(
         self,
         name: Optional[str],
         description: Optional[str],
         inports: Optional[List[str]] = None,
         outports: Optional[List[str]] = None,
+        queue_factory: Callable[[], Any] = InprocQueue,
     ):
         # Set name and description for this block
         self.name = name or self.__class__.__name__
+        # True only for Network instances; precomputed so the connect
+        # path tests one attribute instead of calling isinstance per
+        # block per connect.
+        self._is_network = False
         self.description = description or "No description provided."
 
-        # Initialize input and output port lists
-        self.inports = inports or []
-        self.outports = outports or []
+        # Port lists are frozen as tuples: the wiring never mutates
+        # them after construction, and a tuple is smaller than a list
+        # and cannot be changed behind the connect logic's back.
+        self.inports = tuple(inports or ())
+        self.outports = tuple(outports or ())
 
         # Check for duplicate port names
         if len(set(self.inports)) != len(self.inports):
@@ -140,19 +406,45 @@ class Block:
             raise ValueError(
                 f"Duplicate outport names in block '{self.name}'.")
 
-        # self.in_q[inport] is a SimpleQueue
-        self.in_q: Dict[str, SimpleQueue] = {
-            port: SimpleQueue() for port in self.inports
-        }
-        # self.in_q[outport] is initially None. It will become a SimpleQueue
+        # Frozen membership sets: 'port in block.inports' scans a
+        # list, which check() would otherwise pay per connection.
+        self._inports_set = frozenset(self.inports)
+        self._outports_set = frozenset(self.outports)
+
+        # self.in_q[inport] is a queue. The default InprocQueue fits
+        # blocks sharing one process; Network.connect swaps in a
+        # different queue implementation when its transport requires one. A block
+        # deployed outside a Network can pass its own queue_factory
+        # (anything is_queue accepts, e.g. multiprocessing.SimpleQueue).
+        self.in_q: Dict[str, Any] = _PortMap(self.inports, queue_factory)
+        # self.in_q[outport] is initially None. It will become a queue
         # when this outport is connected to another port.
-        self.out_q: Dict[str, Optional[SimpleQueue]] = {
-            port: None for port in self.outports
-        }
-        # Ensure that the block has a  defined `run()` method.
-        if not hasattr(self, "run") or not inspect.ismethod(getattr(self, "run")):
+        self.out_q: Dict[str, Optional[Any]] = _PortMap(self.outports)
+
+    def close(self):
+        """
+        Return this block's pipe-backed queues to the module pool so
+        a network built later reuses their file descriptors. Call
+        after the block has finished running.
+
+        """
+        for port in list(self.in_q):
+            queue = self.in_q[port]
+            if isinstance(queue, _PipeQueue):
+                while not queue.empty():
+                    queue.get()
+                _QUEUE_POOL.append(queue)
+                self.in_q[port] = None
+
+    def __init_subclass__(cls, **kwargs):
+        # Ensure that every Block subclass defines or inherits a
+        # `run()` method. This is a class invariant, so it is checked
+        # once when the subclass is defined rather than on every
+        # instantiation.
+        super().__init_subclass__(**kwargs)
+        if not callable(getattr(cls, "run", None)):
             raise NotImplementedError(
-                f"Class {self.__class__.__name__}, see block {name} must define a `run()` method."
+                f"Class {cls.__name__} must define a `run()` method."
             )
 
 
@@ -180,6 +472,9 @@ class Network(Block):
 
     """
 
+    __slots__ = ("blocks", "connections", "transport", "_connected",
+                 "_futures", "_started")
+
     def __init__(
         self,
         name: str = None,
@@ -188,6 +483,8 @@ class Network(Block):
         outports: Optional[List[str]] = None,
         blocks: Dict[str, Block] = None,
         connections: List[Tuple[str, str, str, str]] = None,
+        transport: str = "inproc",
+        fuse: bool = False,
     ):
         # Initialize as a Block
         super().__init__(
@@ -199,6 +496,19 @@ class Network(Block):
         # they can be edited by the functions edit_blocks and edit_connections.
         self.blocks = blocks or {}
         self.connections = connections or []
+        self._is_network = True
+        # How messages move between this network's blocks; see TRANSPORTS.
+        if transport not in TRANSPORTS:
+            raise ValueError(
+                f"Unknown transport '{transport}' for network '{self.name}'. "
+                f"Choose one of {sorted(TRANSPORTS)}."
+            )
+        self.transport = transport
+        # Optionally collapse linear chains of SimpleAgents into fused
+        # agents before ports are connected, so intra-chain messages
+        # skip the queues entirely.
+        if fuse:
+            self.fuse_linear_chains()
 
         # Create queues for the network-level, i.e. externally visible, inports.
         # For inport in self.inports,  self.in_q[inport] is a queue.
@@ -210,77 +520,205 @@ class Network(Block):
         # Create queues for the network-level, i.e. externally visible, outports.
         # Similar to self.in_q
         self.out_q = {}
-        # Connect blocks of the network.
+        # Connect blocks of the network. The flag lets connect()
+        # return immediately when an enclosing network's connect()
+        # recurses into this one later.
+        self._connected = False
+        # name -> Future of the component's run, while run() is
+        # executing. stop() waits on these to order the shutdown;
+        # _started signals that they exist, so a stop() racing run()
+        # does not read them too early.
+        self._futures = None
+        self._started = Event()
         self.connect()
 
+    def close(self):
+        """Close every component block, then this network."""
+        for block in self.blocks.values():
+            block.close()
+        super().close()
+
     def connect_ports(self):
-        # Connect ports between blocks and ports of the network
+        # Validate every edge first, then wire them all without
+        # exception handling: the per-edge try/except frames the old
+        # single loop paid are gone from the wiring pass.
+        self.validate_edges()
+        self.wire_edges()
+
+    def validate_edges(self):
+        # One precondition pass over the edges. Raises on the first
+        # bad block or port name, so wire_edges can run with no
+        # checks and no try/except.
         for from_block, from_port, to_block, to_port in self.connections:
-            try:
-                if from_block == "external":
-                    # Network input connected to component input
-                    # In this case, from_port is an input port of the network.
-                    # Messages sent to from_port of the network are sent to
-                    # to_port of to_block.
-                    # [input from_port of network ]   --->   [to_port of to_block]
-                    if from_port not in self.in_q:
-                        raise ValueError(
-                            f"Input port '{from_port}' not in network '{self.name}'."
-                        )
-                    if to_port not in self.blocks[to_block].in_q:
-                        raise ValueError(
-                            f"Input port '{to_port}' not in block '{self.blocks[to_block]}'."
-                        )
-                    if not is_queue(self.blocks[to_block].in_q[to_port]):
-                        raise TypeError(
-                            "{self.blocks[to_block].in_q[to_port]} is not a queue. "
-                        )
-                    self.in_q[from_port] = self.blocks[to_block].in_q[to_port]
-                elif to_block == "external":
-                    # Connect component outport to network outport.
-                    # In this case, to_port is an output port of the network.
-                    # Messages sent from from_port of from_block are sent from
-                    # to_port of the network.
-                    # [from_port of from_block ]   --->   [output to_port of network]
-                    if to_port not in self.out_q:
-                        raise ValueError(
-                            f"Output port '{to_port}' not found in network '{self.name}'."
-                        )
-                    if from_port not in self.blocks[from_block].out_q:
-                        raise ValueError(
-                            f"out_port {from_port} not in block {self.blocks[from_block]} "
-                        )
-                    if not is_queue(self.out_q[to_port]):
-                        raise TypeError(
-                            "{self.out_q[to_port]} of block {self.name} is not a queue. "
-                        )
-                    self.blocks[from_block].out_q[from_port] = self.out_q[to_port]
-                else:
-                    # Connect from_port of from_block to to_port of to_block
-                    # [from_port of from_block ]   --->   [to_port of to_block]
-                    if from_port not in self.blocks[from_block].out_q:
-                        raise ValueError(
-                            f"out_port {from_port} not in block {self.blocks[from_block]} "
-                        )
-                    if to_port not in self.blocks[to_block].in_q:
-                        raise ValueError(
-                            f"Input port '{to_port}' not in block '{self.blocks[to_block]}'."
-                        )
-                    if not is_queue(self.blocks[to_block].in_q[to_port]):
-                        raise TypeError(
-                            "{self.blocks[to_block].in_q[to_port]} of  of block {self.name} is not a queue. "
-                        )
-                    self.blocks[from_block].out_q[from_port] = self.blocks[
-                        to_block
-                    ].in_q[to_port]
-            except KeyError as e:
-                raise ValueError(
-                    f"Invalid block name in connection: {e}. Check connection {from_block}->{to_block}."
-                )
-            except Exception as e:
-                raise ValueError(
-                    f"Error connecting '{from_block}.{from_port}' to '{to_block}.{to_port}': {e}"
-                )
+            if from_block == "external":
+                # [input from_port of network ]   --->   [to_port of to_block]
+                if from_port not in self.in_q:
+                    raise ValueError(
+                        f"Input port '{from_port}' not in network '{self.name}'."
+                    )
+                if to_block not in self.blocks:
+                    raise ValueError(
+                        f"Invalid block name in connection: '{to_block}'. "
+                        f"Check connection {from_block}->{to_block}."
+                    )
+                if to_port not in self.blocks[to_block].in_q:
+                    raise ValueError(
+                        f"Input port '{to_port}' not in block '{self.blocks[to_block]}'."
+                    )
+            elif to_block == "external":
+                # [from_port of from_block ]   --->   [output to_port of network]
+                if to_port not in self.out_q:
+                    raise ValueError(
+                        f"Output port '{to_port}' not found in network '{self.name}'."
+                    )
+                if from_block not in self.blocks:
+                    raise ValueError(
+                        f"Invalid block name in connection: '{from_block}'. "
+                        f"Check connection {from_block}->{to_block}."
+                    )
+                if from_port not in self.blocks[from_block].out_q:
+                    raise ValueError(
+                        f"out_port {from_port} not in block {self.blocks[from_block]} "
+                    )
+            else:
+                # [from_port of from_block ]   --->   [to_port of to_block]
+                if from_block not in self.blocks or to_block not in self.blocks:
+                    missing = from_block if from_block not in self.blocks else to_block
+                    raise ValueError(
+                        f"Invalid block name in connection: '{missing}'. "
+                        f"Check connection {from_block}->{to_block}."
+                    )
+                if from_port not in self.blocks[from_block].out_q:
+                    raise ValueError(
+                        f"out_port {from_port} not in block {self.blocks[from_block]} "
+                    )
+                if to_port not in self.blocks[to_block].in_q:
+                    raise ValueError(
+                        f"Input port '{to_port}' not in block '{self.blocks[to_block]}'."
+                    )
+
+    def wire_edges(self):
+        # Wire validated edges: plain dict assignments, no checks.
+        blocks = self.blocks
+        for from_block, from_port, to_block, to_port in self.connections:
+            if from_block == "external":
+                self.in_q[from_port] = blocks[to_block].in_q[to_port]
+            elif to_block == "external":
+                blocks[from_block].out_q[from_port] = self.out_q[to_port]
+            else:
+                blocks[from_block].out_q[from_port] = blocks[to_block].in_q[to_port]
+
+    def find_linear_chains(self) -> List[List[str]]:
+        """
+        Return maximal chains [A, B, ...] of component SimpleAgents
+        where each agent's single outport feeds the next agent's
+        single inport and nothing else taps the link. Messages on
+        such a link can be handed to the next handler directly
+        instead of crossing a queue.
+
+        """
+        # An edge A -> B is fusible when A and B are SimpleAgents,
+        # A's only outport feeds B's only inport, and that inport is
+        # fed by no other edge.
+        in_edges: Dict[Tuple[str, str], int] = defaultdict(int)
+        for from_block, from_port, to_block, to_port in self.connections:
+            if to_block != "external":
+                in_edges[(to_block, to_port)] += 1
+        next_of: Dict[str, str] = {}
+        has_predecessor = set()
+        for from_block, from_port, to_block, to_port in self.connections:
+            if from_block == "external" or to_block == "external":
+                continue
+            upstream = self.blocks.get(from_block)
+            downstream = self.blocks.get(to_block)
+            if not isinstance(upstream, SimpleAgent):
+                continue
+            if not isinstance(downstream, SimpleAgent):
+                continue
+            if len(upstream.outports) != 1 or len(downstream.inports) != 1:
+                continue
+            # Fusion hands messages to per-message handlers; agents
+            # using handle_msg_batch keep their own drain loop.
+            if upstream.handle_msg is None or downstream.handle_msg is None:
+                continue
+            if in_edges[(to_block, to_port)] != 1:
+                continue
+            next_of[from_block] = to_block
+            has_predecessor.add(to_block)
+        # Walk each chain from its head.
+        chains = []
+        for head in next_of:
+            if head in has_predecessor:
+                continue
+            chain = [head]
+            while chain[-1] in next_of:
+                chain.append(next_of[chain[-1]])
+            chains.append(chain)
+        return chains
+
+    def fuse_linear_chains(self):
+        # Replace each linear chain of SimpleAgents with one
+        # FusedSimpleAgent and drop the intra-chain connections.
+        # Edges into the head of a chain and out of its tail are
+        # rewired to the fused agent.
+        for chain in self.find_linear_chains():
+            stages = [self.blocks[block_name] for block_name in chain]
+            fused = FusedSimpleAgent(stages=stages)
+            head, tail = chain[0], chain[-1]
+            chain_set = set(chain)
+            for block_name in chain:
+                del self.blocks[block_name]
+            self.blocks[fused.name] = fused
+            new_connections = []
+            for connect in self.connections:
+                from_block, from_port, to_block, to_port = connect
+                if from_block in chain_set and to_block in chain_set:
+                    continue  # intra-chain: handled inside the fused agent
+                if from_block == tail:
+                    from_block = fused.name
+                if to_block == head:
+                    to_block = fused.name
+                new_connections.append(
+                    (from_block, from_port, to_block, to_port))
+            self.connections = new_connections
+
+    def select_transport_queues(self):
+        # Pick the queue implementation for each component inport from the
+        # network's transport, before any edge takes a reference to the
+        # queue. Count the edges that write to each inport: an inport fed
+        # by exactly one edge has a single producer, so under the "thread"
+        # transport it gets the lock-free SpscQueue while merge inports
+        # need SimpleQueue. Under the default "inproc" transport every
+        # inport keeps its bare deque, and under "process" every inport
+        # gets a SimpleQueue pipe.
+        writers: Dict[Tuple[str, str], int] = {}
+        for from_block, from_port, to_block, to_port in self.connections:
+            if to_block != "external":
+                key = (to_block, to_port)
+                writers[key] = writers.get(key, 0) + 1
+        for (to_block, to_port), count in writers.items():
+            block = self.blocks.get(to_block)
+            # A component network's in_q entries alias queues owned by its
+            # inner blocks; swapping the alias here would disconnect them.
+            # Bad block or port names are left for connect_ports to report.
+            if block is None or block._is_network:
+                continue
+            queue = block.in_q.get(to_port)
+            if queue is None:
+                continue
+            if self.transport == "inproc":
+                if not isinstance(queue, InprocQueue):
+                    block.in_q[to_port] = InprocQueue()
+            elif self.transport == "zmq-ipc":
+                if not isinstance(queue, ZmqQueue):
+                    block.in_q[to_port] = ZmqQueue()
+            elif self.transport == "thread" and count == 1:
+                if not isinstance(queue, SpscQueue):
+                    block.in_q[to_port] = SpscQueue()
+            elif isinstance(queue, (InprocQueue, SpscQueue)):
+                # "process", or a "thread" merge inport: both need the
+                # fork-safe SimpleQueue.
+                block.in_q[to_port] = _alloc_simple_queue()
 
     def connect(self):
         """
@@ -288,14 +726,22 @@ class Network(Block):
         it will call its own connect() method first. Then, the current network's
         own external and internal connections are connected.
         """
+        # A network wires itself once, in its own __init__. Every
+        # ancestor network's connect() recurses into it again; without
+        # this short-circuit a leaf at depth d is re-wired d times.
+        if self._connected:
+            return
         try:
             # Step 1: Recursively connect inner networks
-            for block_name, block in self.blocks.items():
-                if isinstance(block, Network):
+            for block in self.blocks.values():
+                if block._is_network:
                     block.connect()
 
-            # Step 2: Connect this network's edges
+            # Step 2: Give each inport the queue its transport needs,
+            # then connect this network's edges.
+            self.select_transport_queues()
             self.connect_ports()
+            self._connected = True
 
         except Exception as e:
             raise RuntimeError(
@@ -311,39 +757,6 @@ class Network(Block):
     """
             ) from e
 
-    def __init__(
-        self,
-        name: str = None,
-        description: str = None,
-        inports: Optional[List[str]] = None,
-        outports: Optional[List[str]] = None,
-        blocks: Dict[str, Block] = None,
-        connections: List[Tuple[str, str, str, str]] = None,
-    ):
-        # Initialize as a Block
-        super().__init__(
-            name=name, description=description, inports=inports, outports=outports
-        )
-
-        # Store the network's internal blocks and connection graph.
-        # A network's blocks and connections can be passed in as parameters or
-        # they can be edited by the functions edit_blocks and edit_connections.
-        self.blocks = blocks or {}
-        self.connections = connections or []
-
-        # Create queues for the network-level, i.e. externally visible, inports.
-        # For inport in self.inports,  self.in_q[inport] is a queue.
-        # Messages sent to inport are put on the queue self.in_q[inport].
-        # Initially, self.in_q is empty. (key, value) pairs are added to self.in_q
-        # when network-level inports are connected to outports of component
-        # blocks.
-        self.in_q = {}
-        # Create queues for the network-level, i.e. externally visible, outports.
-        # Similar to self.in_q
-        self.out_q = {}
-        # Connect blocks of the network.
-        self.connect()
-
     def check(self):
         """
         Validates that:
@@ -359,14 +772,12 @@ class Network(Block):
             An inport of a component block can be fed from multiple inports of the
             network and from multiple outports of component blocks.
 
-        """
+        The validation is one linear pass over self.connections that
+        builds connection counters, followed by one O(1) counter lookup
+        per port -- rather than re-scanning the connection list for
+        every port of every block.
 
-        # Helper for clear errors
-        def assert_single_connection(port, matches):
-            if len(matches) != 1:
-                raise ValueError(
-                    f"{port} must be connected exactly once, but found {len(matches)} connections in block {self.name}."
-                )
+        """
 
         # 1. Make sure that there is no block called 'external'
         if "external" in self.blocks:
@@ -374,20 +785,39 @@ class Network(Block):
                 " *external* is a reserved keyword but is used as a block name in {self.name}."
             )
 
-        # 2. Check connections
+        # 2. Check connections. The same pass builds the counters that
+        # steps 3-5 consult: how often each network port appears in an
+        # external connection, and how often each block port appears as
+        # a source or a target.
+        external_in_count: Dict[str, int] = defaultdict(int)
+        external_out_count: Dict[str, int] = defaultdict(int)
+        out_external_count: Dict[Tuple[str, str], int] = defaultdict(int)
+        out_internal_count: Dict[Tuple[str, str], int] = defaultdict(int)
+        in_count: Dict[Tuple[str, str], int] = defaultdict(int)
         for connect in self.connections:
+            if connect[0] == "external":
+                external_in_count[connect[1]] += 1
+            else:
+                if connect[2] == "external":
+                    out_external_count[(connect[0], connect[1])] += 1
+                else:
+                    out_internal_count[(connect[0], connect[1])] += 1
+            if connect[2] == "external":
+                external_out_count[connect[3]] += 1
+            else:
+                in_count[(connect[2], connect[3])] += 1
             # Check connections from network input ports
             if connect[0] == "external":
-                if connect[1] not in self.inports:
+                if connect[1] not in self._inports_set:
                     raise ValueError(
                         f" The network '{self.name}' has no inport called {connect[1]}."
                     )
-                if connect[2] not in self.blocks.keys():
+                if connect[2] not in self.blocks:
                     raise ValueError(
                         f""" The network {self.name} inport {connect[1]} is connected to block {connect[2]} 
                         which is not one of the declared blocks of the network."""
                     )
-                if connect[3] not in self.inports:
+                if connect[3] not in self._inports_set:
                     raise ValueError(
                         f""" The network {self.name} input port {connect[1]} is connected to port {connect[3]}
                         of block {connect[2]}. But {connect[3]} is not an input port of block {connect[2]}."""
@@ -395,38 +825,38 @@ class Network(Block):
 
             # Check connections to network output ports
             if connect[2] == "external":
-                if connect[3] not in self.outports:
+                if connect[3] not in self._outports_set:
                     raise ValueError(
                         f""" The network {self.name} has no output port called {connect[3]}."""
                     )
-                if connect[0] not in self.blocks.keys():
+                if connect[0] not in self.blocks:
                     raise ValueError(
                         f""" The network {self.name} output port {connect[3]} is connected to 
                         block {connect[0]} which is not one of the declared blocks of the network."""
                     )
-                if connect[1] not in self.outports:
+                if connect[1] not in self._outports_set:
                     raise ValueError(
                         f""" The network {self.name} output port {connect[3]} is connected to port {connect[1]} 
                         of block {connect[0]}. But {connect[1]} is not an output port of block {connect[0]}."""
                     )
             # Check internal connections
             if (connect[0] != "external") and (connect[2] != "external"):
-                if connect[0] not in self.blocks.keys():
+                if connect[0] not in self.blocks:
                     raise ValueError(
                         f""" The {connect} of network {self.name} is incorrect.
                         {connect[0]} is not a block of the network."""
                     )
-                if connect[2] not in self.blocks.keys():
+                if connect[2] not in self.blocks:
                     raise ValueError(
                         f""" The {connect} of network {self.name} is incorrect.
                         {connect[2]} is not a block of the network."""
                     )
-                if connect[1] not in self.blocks[connect[0]].outports:
+                if connect[1] not in self.blocks[connect[0]]._outports_set:
                     raise ValueError(
                         f""" The {connect} of network {self.name} is incorrect. {connect[1]} is not an output
                          port of block {self.blocks[connect[0]].name}."""
                     )
-                if connect[3] not in self.blocks[connect[2]].inports:
+                if connect[3] not in self.blocks[connect[2]]._inports_set:
                     raise ValueError(
                         f""" The {connect} of network {self.name} is incorrect.
                         {connect[3]} is not an input port of block {self.blocks[connect[2]].name}."""
@@ -434,81 +864,151 @@ class Network(Block):
 
         # 3. Validate network-level inports
         for inport in self.inports:
-            matches = [
-                e for e in self.connections if e[0] == "external" and e[1] == inport
-            ]
-            assert_single_connection(
-                port=f"Network {self.name} inport '{inport}'", matches=matches
-            )
+            if external_in_count[inport] != 1:
+                raise ValueError(
+                    f"Network {self.name} inport '{inport}' must be connected exactly once, but found {external_in_count[inport]} connections in block {self.name}."
+                )
 
         # 4. Validate network-level outports
         for outport in self.outports:
-            matches = [
-                e for e in self.connections if e[2] == "external" and e[3] == outport
-            ]
-            assert_single_connection(
-                port=f"Network {self.name}  outport '{outport}'", matches=matches
-            )
+            if external_out_count[outport] != 1:
+                raise ValueError(
+                    f"Network {self.name}  outport '{outport}' must be connected exactly once, but found {external_out_count[outport]} connections in block {self.name}."
+                )
 
         # 5. Validate each block’s inports and outports
         for block_name, block in self.blocks.items():
             # Outports
             for outport in block.outports or []:
-                to_external = [
-                    e
-                    for e in self.connections
-                    if e[0] == block_name and e[1] == outport and e[2] == "external"
-                ]
-                to_internal = [
-                    e
-                    for e in self.connections
-                    if e[0] == block_name and e[1] == outport and e[2] != "external"
-                ]
-
-                if len(to_external) == 1 and len(to_internal) == 0:
-                    continue  # valid external connection
-                elif len(to_internal) == 1 and len(to_external) == 0:
-                    continue  # valid internal connection
-                else:
+                to_external = out_external_count[(block_name, outport)]
+                to_internal = out_internal_count[(block_name, outport)]
+
+                if to_external + to_internal != 1:
                     raise ValueError(
                         f"""Outport '{outport}' of block '{block_name}' of network {self.name}
-                        must be connected exactly once. It is connected to {len(to_external)}
-                        outports of the network and to {len(to_internal)} inports of blocks
+                        must be connected exactly once. It is connected to {to_external}
+                        outports of the network and to {to_internal} inports of blocks
                         in the network."""
                     )
 
             # Inports
             for inport in block.inports or []:
-                from_external = [
-                    e
-                    for e in self.connections
-                    if e[0] == "external" and e[3] == inport and e[2] == block_name
-                ]
-                from_internal = [
-                    e
-                    for e in self.connections
-                    if e[3] == inport and e[2] == block_name and e[0] != "external"
-                ]
-
-                if len(from_external) + len(from_internal) == 0:
+                if in_count[(block_name, inport)] == 0:
                     print(
-                        f"""WARNING. Input port {inport} of block {block_name} of 
+                        f"""WARNING. Input port {inport} of block {block_name} of
                           network {self.name} is not connected."""
                     )
 
     def run(self):
         # Check that connections are proper.
         self.check()
+        if not self.blocks:
+            return
         try:
-            # Execute all blocks in sequence
-            for block in self.blocks.values():
-                block.run()
+            # Run every component block on its own worker thread.
+            # Blocks communicate only through queues, so no other
+            # synchronization is needed, and independent blocks -- for
+            # example the branches of a diamond -- make progress
+            # concurrently instead of waiting their turn in a
+            # sequential loop. A component network recurses inside its
+            # worker thread.
+            with ThreadPoolExecutor(max_workers=len(self.blocks)) as pool:
+                self._futures = {name: pool.submit(block.run)
+                                 for name, block in self.blocks.items()}
+                self._started.set()
+                for future in self._futures.values():
+                    future.result()
         except Exception as e:
             raise RuntimeError(
                 f"Network '{self.name}' failed during execution: {e}")
 
+    def _sort_blocks(self) -> Tuple[List[str], set]:
+        # Kahn's algorithm over the internal connections. Returns the
+        # names in producers-first order, and the set of names that
+        # could not be ordered: blocks on a cycle, or fed (however
+        # indirectly) by one. The unordered names are appended at the
+        # end of the order.
+        indegree = {name: 0 for name in self.blocks}
+        successors: Dict[str, List[str]] = defaultdict(list)
+        for from_block, _, to_block, _ in self.connections:
+            if from_block == "external" or to_block == "external":
+                continue
+            successors[from_block].append(to_block)
+            indegree[to_block] += 1
+        ready = deque(
+            name for name in self.blocks if indegree[name] == 0)
+        order = []
+        while ready:
+            name = ready.popleft()
+            order.append(name)
+            for successor in successors[name]:
+                indegree[successor] -= 1
+                if indegree[successor] == 0:
+                    ready.append(successor)
+        unordered = set()
+        if len(order) < len(self.blocks):
+            ordered = set(order)
+            unordered = {name for name in self.blocks
+                         if name not in ordered}
+            order.extend(
+                name for name in self.blocks if name in unordered)
+        return order, unordered
+
+    def topological_order(self) -> List[str]:
+        """
+        Return component names ordered so that every producer comes
+        before its consumers (Kahn's algorithm over the internal
+        connections). Components wired in a cycle have no such order;
+        they are appended after the acyclic part.
+
+        """
+        return self._sort_blocks()[0]
+
+    def stop(self):
+        """
+        Stop a running network whose streams do not carry their own
+        '__STOP__'. Components are stopped producers-first: a stop is
+        put on a component's inports only after every internal
+        producer feeding it has finished running, so everything a
+        producer sent -- including messages it emitted after its own
+        stop was queued -- is ahead of the consumer's stop, and no
+        message is dropped. Components on a cycle (or fed by one)
+        would wait forever for their producers to finish; they get a
+        stop injected immediately, best effort.
+
+        Call from another thread while run() is executing; component
+        networks are stopped recursively.
+
+        """
+        # If run() has not populated the futures yet, give it a
+        # moment; stopping with no run in flight is still allowed and
+        # degrades to direct injection.
+        self._started.wait(timeout=1.0)
+        futures = self._futures or {}
+        order, unordered = self._sort_blocks()
+        producers: Dict[str, set] = defaultdict(set)
+        for from_block, _, to_block, _ in self.connections:
+            if from_block != "external" and to_block != "external":
+                producers[to_block].add(from_block)
+        for name in order:
+            if name not in unordered:
+                for producer in producers[name]:
+                    future = futures.get(producer)
+                    if future is not None:
+                        # Wait without raising; run() reports errors.
+                        future.exception()
+            block = self.blocks[name]
+            if block._is_network:
+                block.stop()
+                continue
+            for queue in block.in_q.queues:
+                if queue is not None:
+                    queue.put(STOP)
+
 
 class Agent(Block):
+    __slots__ = ("_send_buf", "_recv_buf", "_recv_buf_list", "_run_fn")
+
     def __init__(
         self,
         name: str = None,
@@ -529,23 +1029,57 @@ class Agent(Block):
             outports=outports,
         )
 
-        # Create in_q and out_q
-        # The queues associated with out_q[outport] will be
-        # assigned when ports of blocks are connected.
-        in_q = {inport: SimpleQueue() for inport in inports}
-        out_q = {outport: None for outport in outports}
+        # Block.__init__ has created in_q and out_q. The queues
+        # associated with out_q[outport] will be assigned when ports
+        # of blocks are connected.
 
-        # Set instance-specific attributes
-        self.inports = inports
-        self.outports = outports
-        self.in_q = in_q
-        self.out_q = out_q
+        # Messages buffered by send_batch, per outport, until a full
+        # batch is put on the queue or flush is called.
+        self._send_buf: Dict[str, list] = {outport: [] for outport in outports}
+        # Messages from a received batch that recv has not yet returned.
+        self._recv_buf: Dict[str, deque] = {
+            inport: deque() for inport in inports}
+        # The same deques by inport index, for the recv_i fast path.
+        self._recv_buf_list: List[deque] = [
+            self._recv_buf[inport] for inport in inports]
 
         # Optional custom run function
         self._run_fn = run_fn
 
     def send(self, msg, outport: str):
         """Send msg on outport"""
+        # One dict lookup on the hot path, resolving straight to the
+        # queue's bound put; the two error cases are told apart only
+        # after the lookup misses.
+        put = self.out_q.put_map.get(outport)
+        if put is None:
+            if outport not in self.out_q:
+                raise ValueError(
+                    f"{outport} of agent {self.name} is not an output port.")
+            raise ValueError(
+                f"The outport, {outport}, of agent {self.name} is not connected to an input port."
+            )
+        put(msg)
+
+    def send_i(self, msg, outport_index: int):
+        """
+        Fast-path send: the outport is identified by its index in
+        self.outports (see self.out_q.index) instead of by name, so
+        the per-message cost is a list index landing on the queue's
+        bound put rather than a string hash plus validation.
+
+        """
+        self.out_q.puts[outport_index](msg)
+
+    def send_batch(self, msgs, outport: str):
+        """
+        Send several messages on outport with one queue operation per
+        BATCH_SIZE messages. Messages are buffered until a full batch
+        accumulates; call flush to send a partial batch. For bursty
+        producers this pays the queue's lock and pipe cost once per
+        batch instead of once per message.
+
+        """
         if outport not in self.outports or outport not in self.out_q:
             raise ValueError(
                 f"{outport} of agent {self.name} is not an output port.")
@@ -553,7 +1087,55 @@ class Agent(Block):
             raise ValueError(
                 f"The outport, {outport}, of agent {self.name} is not connected to an input port."
             )
-        self.out_q[outport].put(msg)
+        buf = self._send_buf[outport]
+        buf.extend(msgs)
+        put = self.out_q.put_map[outport]
+        while len(buf) >= BATCH_SIZE:
+            put(_MessageBatch(buf[:BATCH_SIZE]))
+            del buf[:BATCH_SIZE]
+
+    def flush(self, outport: str):
+        """Send the messages buffered by send_batch on outport, if any."""
+        buf = self._send_buf.get(outport)
+        if buf:
+            self.out_q.put_map[outport](_MessageBatch(buf))
+            self._send_buf[outport] = []
+
+    def send_shm(self, buf, outport: str):
+        """
+        Send a large bytes-like message (bytes, bytearray, memoryview)
+        through shared memory. The payload is written once into a
+        shared memory block and only a small descriptor crosses the
+        queue, so the bytes are not pickled and not copied through a
+        pipe -- the cost that dominates send for multi-MB messages
+        between processes. The receiver must use recv_shm.
+
+        """
+        data = memoryview(buf).cast("B")
+        shm = shared_memory.SharedMemory(create=True, size=max(1, data.nbytes))
+        shm.buf[:data.nbytes] = data
+        self.send(_ShmDescriptor(shm.name, data.nbytes), outport)
+        # The block stays allocated until recv_shm unlinks it; this
+        # process only drops its mapping.
+        shm.close()
+
+    def recv_shm(self, inport: str) -> bytes:
+        """
+        Receive a message sent with send_shm: read the payload bytes
+        straight out of the shared memory block named by the
+        descriptor, then free the block.
+
+        """
+        msg = self.recv(inport)
+        if not isinstance(msg, _ShmDescriptor):
+            # A regular message (for example '__STOP__') on the same
+            # inport is returned unchanged.
+            return msg
+        shm = shared_memory.SharedMemory(name=msg.name)
+        data = bytes(shm.buf[:msg.length])
+        shm.close()
+        shm.unlink()
+        return data
 
     def recv(self, inport: str) -> Any:
         """Receive a message from an input port."""
@@ -565,7 +1147,47 @@ class Agent(Block):
             raise ValueError(
                 f"[{self.name}] Input port '{inport}' of agent {self.name}  is not connected."
             )
-        return self.in_q[inport].get()
+        # Return buffered messages from an earlier batch first. A batch
+        # from the queue is unpacked into the buffer, so the caller sees
+        # one message per recv whether or not the sender batched.
+        buf = self._recv_buf[inport]
+        get = self.in_q.get_map[inport]
+        while not buf:
+            msg = get()
+            if isinstance(msg, _MessageBatch):
+                buf.extend(msg)
+            else:
+                return msg
+        return buf.popleft()
+
+    def recv_fast(self, inport: str) -> Any:
+        """
+        Receive from inport with no port validation and no batch
+        unpacking: one dict lookup plus the queue's get. For receive
+        loops where the port name is statically known to be valid and
+        the sender does not use send_batch. A loop that is hotter
+        still can bind the get once, as the compiled SimpleAgent
+        loop does.
+
+        """
+        return self.in_q.get_map[inport]()
+
+    def recv_i(self, inport_index: int) -> Any:
+        """
+        Fast-path recv: the inport is identified by its index in
+        self.inports (see self.in_q.index) instead of by name.
+        Batches are unpacked exactly as in recv.
+
+        """
+        buf = self._recv_buf_list[inport_index]
+        get = self.in_q.gets[inport_index]
+        while not buf:
+            msg = get()
+            if isinstance(msg, _MessageBatch):
+                buf.extend(msg)
+            else:
+                return msg
+        return buf.popleft()
 
     def run(self):
         # Run using the injected function, or raise error if missing
@@ -577,6 +1199,9 @@ class Agent(Block):
 
 
 class SimpleAgent(Agent):
+    __slots__ = ("inport", "init_fn", "handle_msg", "handle_msg_batch",
+                 "batch_size")
+
     def __init__(
         self,
         name: str = None,
@@ -585,12 +1210,19 @@ class SimpleAgent(Agent):
         outports: Optional[List[str]] = None,
         init_fn: Optional[Callable[[Agent], None]] = None,
         handle_msg: Optional[Callable[[Agent, str], None]] = None,
+        handle_msg_batch: Optional[Callable[[Agent, list], None]] = None,
+        batch_size: int = BATCH_SIZE,
     ):
         # Validate: if handling messages, must have an input port
-        if handle_msg and not inport:
+        if (handle_msg or handle_msg_batch) and not inport:
             raise ValueError(
                 "If 'handle_msg' of SimpleAgent is provided then 'inport' must also be provided."
             )
+        if handle_msg and handle_msg_batch:
+            raise ValueError(
+                "Provide either 'handle_msg' or 'handle_msg_batch' of "
+                "SimpleAgent, not both."
+            )
 
         # Define inports and outports
         inports = [inport] if inport else []
@@ -608,18 +1240,183 @@ class SimpleAgent(Agent):
         self.inport = inport
         self.init_fn = init_fn
         self.handle_msg = handle_msg
-        self.input_queue = self.in_q[inport] if handle_msg and inport else None
+        self.handle_msg_batch = handle_msg_batch
+        self.batch_size = batch_size
+
+    @property
+    def input_queue(self):
+        """
+        The queue of this agent's single inport, or None when the
+        agent handles no messages. Resolved on each access because
+        the enclosing network's connect may swap the inport's queue
+        for a transport-specific one after this agent is built.
+
+        """
+        if self.inport and (self.handle_msg or self.handle_msg_batch):
+            return self.in_q[self.inport]
+        return None
+
+    # Source of the specialized message loop. The queue's get, the
+    # handler, and the agent are baked in as default arguments, so
+    # every per-message load is a LOAD_FAST: no attribute lookups, no
+    # dict lookups, and no recv call with its port validation.
+    # Batches from send_batch are unpacked as recv would unpack them.
+    _RUN_LOOP_SRC = """\
+def _run_loop(get=get, handle_msg=handle_msg, agent=agent,
+              batch_type=batch_type, buffered=buffered, stop=stop):
+    pop = buffered.popleft
+    while True:
+        if buffered:
+            msg = pop()
+        else:
+            msg = get()
+            if type(msg) is batch_type:
+                buffered.extend(msg)
+                msg = pop()
+        if msg is stop or msg == "__STOP__":
+            return
+        handle_msg(agent, msg)
+"""
+
+    def _compile_run_loop(self):
+        # exec the loop source with this agent's queue and handler in
+        # the namespace the defaults are read from. This runs once per
+        # agent; it must wait until the enclosing network has connected
+        # its ports, because connect may swap the inport's queue.
+        namespace = {
+            "get": self.in_q[self.inport].get,
+            "handle_msg": self.handle_msg,
+            "agent": self,
+            "batch_type": _MessageBatch,
+            "buffered": self._recv_buf[self.inport],
+            "stop": STOP,
+        }
+        exec(compile(self._RUN_LOOP_SRC, "<simple_agent_run>", "exec"),
+             namespace)
+        return namespace["_run_loop"]
+
+    def _run_batch_loop(self):
+        # Drain up to batch_size messages per wake-up and hand the
+        # list to handle_msg_batch. The first get of each round blocks
+        # as usual; the rest are taken only while the queue reports
+        # non-empty, so one blocking wait (and, on pipe-backed queues,
+        # one wake-up) is amortized over the whole burst. A queue kind
+        # without a cheap empty() just delivers batches of one.
+        queue = self.in_q[self.inport]
+        get = queue.get
+        empty = getattr(queue, "empty", None)
+        handle_batch = self.handle_msg_batch
+        buffered = self._recv_buf[self.inport]
+        batch_size = self.batch_size
+        batch = []
+        while True:
+            while len(batch) < batch_size:
+                if buffered:
+                    msg = buffered.popleft()
+                elif not batch or (empty is not None and not empty()):
+                    msg = get()
+                    if type(msg) is _MessageBatch:
+                        buffered.extend(msg)
+                        continue
+                else:
+                    break
+                if msg is STOP or msg == "__STOP__":
+                    if batch:
+                        handle_batch(self, batch)
+                    return
+                batch.append(msg)
+            handle_batch(self, batch)
+            batch = []
 
     def run(self):
         # Run the initialization function if it exists
         if self.init_fn:
             self.init_fn(self)
-        # Run the handle_msg function if it exists.
+        # Run the message handler if one was given.
         # Stop processing messages when '__STOP__' is received.
+        if self.handle_msg_batch:
+            self._run_batch_loop()
+            return
         if not self.handle_msg:
             return
+        self._compile_run_loop()()
+
+
+class _ChainLink:
+    # Queue-like object wired into a fused stage's out_q: put hands the
+    # message to the next stage's handler in the same call, so nothing
+    # crosses a queue.
+    def __init__(self, deliver):
+        self.put = deliver
+
+
+class FusedSimpleAgent(Agent):
+    """
+    A chain of SimpleAgents fused into one agent.
+
+    Network.fuse_linear_chains builds one of these for each linear
+    chain A -> B -> ... of SimpleAgents. The fused agent owns the
+    chain head's inport and the chain tail's outports; when a stage
+    sends on its intra-chain outport, the message is handed to the
+    next stage's handle_msg directly. A message that used to cross
+    one queue per link now crosses none.
+
+    A '__STOP__' sent down the chain stops the receiving stage, as it
+    would have stopped that agent's own message loop.
+
+    """
+
+    __slots__ = ("stages", "inport", "_stopped")
+
+    def __init__(self, stages: List[SimpleAgent], name: str = None):
+        first, last = stages[0], stages[-1]
+        super().__init__(
+            name=name or "_".join(stage.name for stage in stages),
+            description="Fused chain: "
+            + " -> ".join(stage.name for stage in stages),
+            inports=list(first.inports),
+            outports=list(last.outports),
+        )
+        self.stages = stages
+        self.inport = first.inport
+        # Edges wired to the fused agent must reach the stage queues:
+        # alias the head's in_q and the tail's out_q.
+        self.in_q = first.in_q
+        self.out_q = last.out_q
+        # Names of stages that received '__STOP__'.
+        self._stopped = set()
+        # Each stage except the tail sends on its single outport into a
+        # _ChainLink that calls the next stage's handler.
+        for stage, next_stage in zip(stages, stages[1:]):
+            stage.out_q[stage.outports[0]] = _ChainLink(
+                self._make_deliver(next_stage))
+
+    def _make_deliver(self, stage: SimpleAgent):
+        def deliver(msg):
+            if stage.name in self._stopped:
+                return
+            if msg is STOP or msg == "__STOP__":
+                self._stopped.add(stage.name)
+                return
+            stage.handle_msg(stage, msg)
+        return deliver
+
+    def run(self):
+        # Initialize every stage in chain order. A head stage with no
+        # inport drives the whole chain from its init_fn.
+        for stage in self.stages:
+            if stage.init_fn:
+                stage.init_fn(stage)
+        # Then run the head's message loop; each handled message flows
+        # through the downstream handlers via the chain links.
+        first = self.stages[0]
+        if not (self.inport and first.handle_msg):
+            return
+        handle_msg = first.handle_msg
+        recv = self.recv
+        inport = self.inport
         while True:
-            msg = self.recv(self.inport)
-            if msg == "__STOP__":
+            msg = recv(inport)
+            if msg is STOP or msg == "__STOP__":
                 break
-            self.handle_msg(self, msg)
+            handle_msg(first, msg)
@@ -1,8 +1,17 @@
 
+import threading
 import unittest
 from multiprocessing import SimpleQueue
 from core import Block, Agent, Network, SimpleAgent
 
+# The "zmq-ipc" transport needs the optional pyzmq package; its test
+# is skipped when pyzmq is not installed.
+try:
+    import zmq  # noqa: F401 -- availability check
+    HAS_ZMQ = True
+except ImportError:
+    HAS_ZMQ = False
+
 
 class TestNetwork(unittest.TestCase):
 
@@ -168,6 +177,270 @@ class TestNetwork(unittest.TestCase):
         # Check run
         self.assertEqual(set(received), {'hello', 'world'})
 
+    def _make_pipeline(self, received, count=50, transport="inproc"):
+        '''
+        Build a feeder -> double -> receiver pipeline where the
+        feeder sends the integers 0..count-1 and the receiver
+        appends each doubled value to received. The middle agent
+        forwards '__STOP__' downstream before stopping.
+
+        '''
+
+        def feeder_init(self):
+            for i in range(count):
+                self.send(msg=i, outport="out")
+            self.send(msg="__STOP__", outport="out")
+
+        def double_run(self):
+            while True:
+                msg = self.recv(inport="in")
+                if msg == "__STOP__":
+                    # Pass the stop on so the receiver stops too.
+                    self.send(msg="__STOP__", outport="out")
+                    break
+                self.send(msg=2 * msg, outport="out")
+
+        def receive_msg(self, msg):
+            received.append(msg)
+
+        return Network(
+            name="Pipeline",
+            blocks={
+                "feeder": SimpleAgent(
+                    name="Feeder", outports=["out"], init_fn=feeder_init),
+                "double": Agent(
+                    name="Double", inports=["in"], outports=["out"],
+                    run_fn=double_run),
+                "receiver": SimpleAgent(
+                    name="Receiver", inport="in", handle_msg=receive_msg),
+            },
+            connections=[
+                ["feeder", "out", "double", "in"],
+                ["double", "out", "receiver", "in"],
+            ],
+            transport=transport,
+        )
+
+    def test_fused_chain(self):
+        '''
+        Tests that a linear chain of SimpleAgents fused with
+        fuse=True delivers the same stream as the unfused network.
+        The fused chain ends when '__STOP__' reaches the chain head,
+        so the middle stage does not forward it.
+
+        '''
+
+        def feeder_init(self):
+            for i in range(50):
+                self.send(msg=i, outport="out")
+            self.send(msg="__STOP__", outport="out")
+
+        def double_msg(self, msg):
+            self.send(msg=2 * msg, outport="out")
+
+        received = []
+
+        def receive_msg(self, msg):
+            received.append(msg)
+
+        net = Network(
+            name="FusedPipeline",
+            blocks={
+                "feeder": SimpleAgent(
+                    name="Feeder", outports=["out"], init_fn=feeder_init),
+                "double": SimpleAgent(
+                    name="Double", inport="in", outports=["out"],
+                    handle_msg=double_msg),
+                "receiver": SimpleAgent(
+                    name="Receiver", inport="in", handle_msg=receive_msg),
+            },
+            connections=[
+                ["feeder", "out", "double", "in"],
+                ["double", "out", "receiver", "in"],
+            ],
+            fuse=True,
+        )
+        # The double -> receiver chain collapses into one fused block.
+        self.assertLess(len(net.blocks), 3)
+        net.run()
+        self.assertEqual(received, [2 * i for i in range(50)])
+
+    def test_thread_transport(self):
+        '''
+        Tests the pipeline on the "thread" transport, which uses
+        SPSC queues for single-producer inports.
+
+        '''
+        received = []
+        self._make_pipeline(received, transport="thread").run()
+        self.assertEqual(received, [2 * i for i in range(50)])
+
+    def test_process_transport(self):
+        '''
+        Tests the pipeline on the "process" transport, which moves
+        messages through fork-safe SimpleQueue pipes.
+
+        '''
+        received = []
+        self._make_pipeline(received, transport="process").run()
+        self.assertEqual(received, [2 * i for i in range(50)])
+
+    @unittest.skipUnless(HAS_ZMQ, "needs the optional pyzmq package")
+    def test_zmq_ipc_transport(self):
+        '''
+        Tests the pipeline on the "zmq-ipc" transport, which moves
+        messages through ZeroMQ PUSH/PULL sockets over ipc://
+        endpoints.
+
+        '''
+        received = []
+        self._make_pipeline(received, transport="zmq-ipc").run()
+        self.assertEqual(received, [2 * i for i in range(50)])
+
+    def test_send_batch_round_trip(self):
+        '''
+        Tests that messages sent with send_batch/flush arrive
+        through recv one at a time, in order.
+
+        '''
+
+        def sender_run(self):
+            self.send_batch(msgs=list(range(100)), outport="out")
+            self.flush(outport="out")
+            self.send(msg="__STOP__", outport="out")
+
+        received = []
+
+        def receiver_run(self):
+            while True:
+                msg = self.recv(inport="in")
+                if msg == "__STOP__":
+                    break
+                received.append(msg)
+
+        net = Network(
+            name="BatchNet",
+            blocks={
+                "sender": Agent(
+                    name="Sender", outports=["out"], run_fn=sender_run),
+                "receiver": Agent(
+                    name="Receiver", inports=["in"], run_fn=receiver_run),
+            },
+            connections=[["sender", "out", "receiver", "in"]],
+        )
+        net.run()
+        self.assertEqual(received, list(range(100)))
+
+    def test_handle_msg_batch(self):
+        '''
+        Tests a SimpleAgent built with handle_msg_batch: every
+        message arrives, grouped into lists of at most batch_size.
+
+        '''
+
+        def feeder_init(self):
+            for i in range(100):
+                self.send(msg=i, outport="out")
+            self.send(msg="__STOP__", outport="out")
+
+        received = []
+        batch_sizes = []
+
+        def handle_batch(self, msgs):
+            batch_sizes.append(len(msgs))
+            received.extend(msgs)
+
+        net = Network(
+            name="BatchDrainNet",
+            blocks={
+                "feeder": SimpleAgent(
+                    name="Feeder", outports=["out"], init_fn=feeder_init),
+                "receiver": SimpleAgent(
+                    name="Receiver", inport="in", batch_size=16,
+                    handle_msg_batch=handle_batch),
+            },
+            connections=[["feeder", "out", "receiver", "in"]],
+        )
+        net.run()
+        self.assertEqual(received, list(range(100)))
+        self.assertTrue(all(size <= 16 for size in batch_sizes))
+
+    def test_stop_pipeline_is_lossless(self):
+        '''
+        Tests Network.stop on a pipeline whose streams carry no
+        '__STOP__': every in-flight message must still be delivered.
+
+        '''
+
+        def feeder_init(self):
+            for i in range(50):
+                self.send(msg=i, outport="out")
+
+        def double_msg(self, msg):
+            self.send(msg=2 * msg, outport="out")
+
+        received = []
+
+        def receive_msg(self, msg):
+            received.append(msg)
+
+        net = Network(
+            name="StopNet",
+            blocks={
+                "feeder": SimpleAgent(
+                    name="Feeder", outports=["out"], init_fn=feeder_init),
+                "double": SimpleAgent(
+                    name="Double", inport="in", outports=["out"],
+                    handle_msg=double_msg),
+                "receiver": SimpleAgent(
+                    name="Receiver", inport="in", handle_msg=receive_msg),
+            },
+            connections=[
+                ["feeder", "out", "double", "in"],
+                ["double", "out", "receiver", "in"],
+            ],
+            transport="thread",
+        )
+        runner = threading.Thread(target=net.run)
+        runner.start()
+        net.stop()
+        runner.join(timeout=10)
+        self.assertFalse(runner.is_alive())
+        self.assertEqual(received, [2 * i for i in range(50)])
+
+    def test_stop_cycle(self):
+        '''
+        Tests Network.stop on two agents wired in a ring, where a
+        stop carried by the stream alone would circulate forever.
+
+        '''
+
+        def forward_msg(self, msg):
+            self.send(msg=msg, outport="out")
+
+        ping = SimpleAgent(
+            name="Ping", inport="in", outports=["out"],
+            handle_msg=forward_msg)
+        pong = SimpleAgent(
+            name="Pong", inport="in", outports=["out"],
+            handle_msg=forward_msg)
+        net = Network(
+            name="Ring",
+            blocks={"ping": ping, "pong": pong},
+            connections=[
+                ["ping", "out", "pong", "in"],
+                ["pong", "out", "ping", "in"],
+            ],
+            transport="thread",
+        )
+        runner = threading.Thread(target=net.run)
+        runner.start()
+        # Set a token circulating, then stop the ring from outside.
+        ping.in_q["in"].put("token")
+        net.stop()
+        runner.join(timeout=10)
+        self.assertFalse(runner.is_alive())
+
     def test_network_check_validation(self):
         sender = SimpleAgent(name="Sender", outports=["out"])
         receiver = SimpleAgent(name="Receiver", inport="in")